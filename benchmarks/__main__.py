@@ -0,0 +1,52 @@
+import argparse
+import json
+import platform
+import sys
+from benchmarks.suite import BENCHMARKS, measure, compare
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        prog='python3 -m benchmarks', description='Time the hot paths of the game on levels of increasing size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 300, 1000],
+                        help='the number of locations of each level')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS.keys(), default=list(BENCHMARKS.keys()),
+                        help='the benchmarks to run (all of them by default)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='how many times each benchmark is run, the best time is kept')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='a JSON file written by --output to compare the results with')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='a benchmark regressed if it is this many times slower or hungrier than the baseline')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for name in args.only:
+            result = measure(name, size, args.repeat)
+            results.append(result)
+            print(f'{name:<18} {size:>7} locations  {result["seconds"] * 1000:>10.2f}ms  {result["peak_memory_bytes"] / 1024:>10.0f}KiB',
+                  file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(report, stream, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    if args.compare:
+        with open(args.compare, 'r') as stream:
+            baseline = json.load(stream)
+        regressions = compare(results, baseline['results'], args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression["benchmark"]} ({regression["size"]} locations): {regression["metric"]} '
+                  f'went from {regression["baseline"]:.6g} to {regression["current"]:.6g} (x{regression["ratio"]:.2f})',
+                  file=sys.stderr)
+        if len(regressions):
+            sys.exit(1)
@@ -0,0 +1,168 @@
+import random
+import time
+import tracemalloc
+from game.baseline import Baseline
+from game.evaluate import Evaluation, evaluate
+from level_generator import generate_locations
+from router import connect_locations
+
+PATHFIND_QUERIES = 200
+PATHS_FROM_STARTS = 20
+# Benchmarks are run again until they've been measured for at least this long (in seconds, setup
+# included), so that the best time of the quickest ones isn't just noise
+MEASURE_MIN_SECONDS = 0.2
+# Smaller differences with the baseline are never regressions, whatever the ratio (in seconds and bytes)
+COMPARE_MIN_SECONDS = 0.01
+COMPARE_MIN_BYTES = 64 * 1024
+
+
+def make_level(size: int, seed: int = 0):
+    """
+    A reproducible level with `size` locations.
+    """
+    return {
+        'name': f'Benchmark {size}',
+        'background_path': '',
+        'locations': list(generate_locations(size, seed)),
+    }
+
+
+def routed_evaluation(config: dict):
+    """
+    An evaluation of the reference router whose connections are all placed.
+    """
+    evaluation = Evaluation(config, connect_locations)
+    evaluation.connect_locations()
+    while len(evaluation.connections_buffer):
+        evaluation.add_next_connection()
+    return evaluation
+
+
+#### BENCHMARKS ####################################
+# Each benchmark takes a level and returns the function to measure.
+
+def bench_router(config: dict):
+    evaluation = Evaluation(config, connect_locations)
+    return evaluation.connect_locations
+
+
+def bench_connect_handler(config: dict):
+    evaluation = routed_evaluation(config)
+    # Every connection twice, once in each direction, to go through the deduplication.
+    calls = [(con.a, con.b) for con in evaluation.graph.connections]
+    calls += [(b, a) for a, b in calls]
+
+    def run():
+        evaluation.connections_buffer.clear()
+        evaluation.connections_created.clear()
+        for a, b in calls:
+            evaluation.connect_handler(a, b)
+    return run
+
+
+def bench_init_itineraries(config: dict):
+    evaluation = Evaluation(config, connect_locations)
+    return evaluation.init_itineraries
+
+
+def bench_pathfind(config: dict):
+    evaluation = routed_evaluation(config)
+    rng = random.Random(0)
+    queries = [(rng.choice(evaluation.locations), rng.choice(evaluation.locations))
+               for _ in range(PATHFIND_QUERIES)]
+
+    def run():
+        for a, b in queries:
+            evaluation.graph.pathfind(a, b)
+    return run
+
+
+def bench_paths_from(config: dict):
+    evaluation = routed_evaluation(config)
+    rng = random.Random(0)
+    n = len(evaluation.locations)
+    # The itineraries of a few starts, tested all at once as in test_all_itineraries
+    starts = [rng.randrange(n) for _ in range(PATHS_FROM_STARTS)]
+
+    def run():
+        for a_idx in starts:
+            evaluation.graph.paths_from(a_idx, range(a_idx + 1, n))
+    return run
+
+
+def bench_baseline(config: dict):
+    locations = Evaluation(config, connect_locations).locations
+    return lambda: Baseline(locations)
+
+
+def bench_evaluation(config: dict):
+    return lambda: evaluate(config, connect_locations)
+
+
+BENCHMARKS = {
+    'router': bench_router,
+    'connect_handler': bench_connect_handler,
+    'init_itineraries': bench_init_itineraries,
+    'pathfind': bench_pathfind,
+    'paths_from': bench_paths_from,
+    'baseline': bench_baseline,
+    'evaluation': bench_evaluation,
+}
+####################################################
+
+
+def measure(name: str, size: int, repeat: int):
+    """
+    Runs a benchmark `repeat` times, or more until MEASURE_MIN_SECONDS, and keeps the best wall time.
+    The peak memory is measured during one more run, as tracemalloc slows everything down.
+    """
+    config = make_level(size)
+    best = None
+    runs = 0
+    measuring_since = time.perf_counter()
+    while runs < repeat or time.perf_counter() - measuring_since < MEASURE_MIN_SECONDS:
+        run = BENCHMARKS[name](config)
+        started_at = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started_at
+        if best == None or elapsed < best:
+            best = elapsed
+        runs += 1
+
+    run = BENCHMARKS[name](config)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'benchmark': name,
+        'size': size,
+        'seconds': best,
+        'peak_memory_bytes': peak,
+    }
+
+
+def compare(results: list, baseline: list, threshold: float):
+    """
+    Compares results with a baseline, returns the regressions: the benchmarks which
+    became more than `threshold` times slower or hungrier, by at least COMPARE_MIN_SECONDS
+    or COMPARE_MIN_BYTES.
+    """
+    previous = {(r['benchmark'], r['size']): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['benchmark'], result['size']))
+        if before == None:
+            continue
+        for key, floor in (('seconds', COMPARE_MIN_SECONDS), ('peak_memory_bytes', COMPARE_MIN_BYTES)):
+            if before[key] > 0 and result[key] / before[key] > threshold and result[key] - before[key] >= floor:
+                regressions.append({
+                    'benchmark': result['benchmark'],
+                    'size': result['size'],
+                    'metric': key,
+                    'baseline': before[key],
+                    'current': result[key],
+                    'ratio': result[key] / before[key],
+                })
+    return regressions
@@ -0,0 +1,19 @@
+import argparse
+import os
+import time
+from game.level import compile_level, load_level
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Compile a JSON level into a binary level which loads much faster.')
+    parser.add_argument('level', help='the JSON level to compile')
+    parser.add_argument('-o', '--output',
+                        help='where to write the compiled level (defaults to the level path with a .level extension)')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.level)[0] + '.level'
+    started_at = time.perf_counter()
+    config = load_level(args.level)
+    compile_level(config, output)
+    print(f'Compiled {len(config["locations"])} locations to {output} in {(time.perf_counter() - started_at) * 1000:.1f}ms')
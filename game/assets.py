@@ -1,14 +1,116 @@
+from collections import OrderedDict
+import hashlib
+import os
 import pygame
-from game.constants import UOM_LOGO_PATH, HEADER_HEIGHT, BOARD_WIDTH, BOARD_HEIGHT
+from game.constants import UOM_LOGO_PATH, HEADER_HEIGHT, BOARD_WIDTH, BOARD_HEIGHT, ASSET_CACHE_DIR, ASSET_CACHE_CAPACITY
+
+
+class AssetCache():
+    """
+    Loads pictures scaled to a given size. The scaled pixels are stored on disk, so that a picture
+    is only decoded and scaled once, and the most recently used surfaces are kept in memory.
+    """
+
+    def __init__(self, directory: str = ASSET_CACHE_DIR, capacity: int = ASSET_CACHE_CAPACITY):
+        self.directory = directory
+        self.capacity = capacity
+        # The surfaces in memory, least recently used first
+        self.surfaces = OrderedDict()
+
+    def load(self, path: str, size: tuple, alpha: int = None):
+        """
+        The picture at `path` scaled to `size`. A None width or height keeps the aspect ratio.
+        Without `alpha` the picture keeps its transparency, otherwise it's made opaque and
+        drawn with this alpha value.
+        """
+        key = (os.path.abspath(path), os.path.getmtime(path), size, alpha)
+        if key in self.surfaces:
+            self.surfaces.move_to_end(key)
+            return self.surfaces[key]
+
+        # The scaled pixels don't depend on the alpha value.
+        pixels = self.__read(key[:3])
+        if pixels == None:
+            surface = self.__scale(pygame.image.load(path), size)
+            pixels = (surface.get_size(),
+                      pygame.image.tostring(surface, 'RGBA'))
+            self.__write(key[:3], pixels)
+        (width, height), data = pixels
+        surface = pygame.image.frombuffer(data, (width, height), 'RGBA')
+        surface = self.__convert(surface, alpha)
+
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def __scale(self, image: pygame.Surface, size: tuple):
+        width, height = size
+        if width == None:
+            width = image.get_rect().width * height / image.get_rect().height
+        if height == None:
+            height = image.get_rect().height * width / image.get_rect().width
+        return pygame.transform.scale(image, (width, height))
+
+    def __convert(self, surface: pygame.Surface, alpha: int):
+        # Pictures in the same pixel format as the window are much faster to draw.
+        if pygame.display.get_surface() == None:
+            return surface.copy()
+        if alpha == None:
+            return surface.convert_alpha()
+        surface = surface.convert()
+        surface.set_alpha(alpha)
+        return surface
+
+    def __file(self, key: tuple):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + '.rgba')
+
+    def __read(self, key: tuple):
+        try:
+            with open(self.__file(key), 'rb') as stream:
+                width = int.from_bytes(stream.read(4), 'little')
+                height = int.from_bytes(stream.read(4), 'little')
+                data = stream.read()
+        except OSError:
+            return None
+        if len(data) != width * height * 4:
+            return None
+        return (width, height), data
+
+    def __write(self, key: tuple, pixels: tuple):
+        (width, height), data = pixels
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.__file(key), 'wb') as stream:
+                stream.write(width.to_bytes(4, 'little'))
+                stream.write(height.to_bytes(4, 'little'))
+                stream.write(data)
+        except OSError:
+            # The cache is only an optimization, the game works without it.
+            pass
+
+
+# Shared by every level played during this session.
+asset_cache = AssetCache()
 
 
 class Assets():
+    """
+    The pictures of a level, loaded the first time they're used.
+    """
+
     def __init__(self, background_path):
-        original_image = pygame.image.load(
-            UOM_LOGO_PATH)
-        self.uom_logo = pygame.transform.scale(
-            original_image, (original_image.get_rect().width * HEADER_HEIGHT / original_image.get_rect().height, HEADER_HEIGHT))
-        original_image = pygame.image.load(
-            background_path)
-        self.background_image = pygame.transform.scale(
-            original_image, (BOARD_WIDTH, BOARD_HEIGHT))
+        self.background_path = background_path
+
+    @property
+    def uom_logo(self):
+        return asset_cache.load(UOM_LOGO_PATH, (None, HEADER_HEIGHT))
+
+    @property
+    def background_image(self):
+        return asset_cache.load(self.background_path, (BOARD_WIDTH, BOARD_HEIGHT))
+
+    @property
+    def faded_background_image(self):
+        # The background as drawn behind the network.
+        return asset_cache.load(self.background_path, (BOARD_WIDTH, BOARD_HEIGHT), 128)
@@ -0,0 +1,163 @@
+import math
+from game.constants import CONNECTION_COST, RAILWAY_UNIT_COST, CHANGE_TRAIN_TIME, RAILWAY_UNIT_TRAVEL_TIME
+from game.utils import INFINITY, SpatialIndex, distance_between
+
+# How many nearest neighbours of each location are looked at first to join the groups of the
+# minimum spanning tree (cf euclidean_mst)
+BASELINE_NEIGHBOURS = 10
+# Up to how many groups the locations too far from the other groups are skipped
+BASELINE_BOXES_MAX_GROUPS = 64
+
+
+class Baseline():
+    """
+    The network submissions are compared to: the Euclidean minimum spanning tree of the locations,
+    the cheapest network connecting all of them, scored with the same formulas as Evaluation.
+    A ratio of 1.2 means 20% more than the baseline. Any network connecting every location costs
+    at least as much as the baseline, but can have shorter travel times.
+    """
+
+    def __init__(self, locations: list):
+        # The distinct locations, a location listed twice only counting once (cf Itineraries)
+        first_indices = {}
+        for i in range(len(locations)):
+            first_indices.setdefault(locations[i], i)
+        self.locations = [locations[i] for i in sorted(first_indices.values())]
+        # The connections of the tree, as pairs of indices in self.locations
+        self.connections = euclidean_mst(self.locations)
+        # The cost of the tree
+        self.cost = sum(distance_between(self.locations[a_idx], self.locations[b_idx]) * RAILWAY_UNIT_COST +
+                        CONNECTION_COST for a_idx, b_idx in self.connections)
+        # The average travel time of every itinerary, on the tree
+        self.average_travel_time = tree_average_travel_time(
+            self.locations, self.connections)
+
+    def ratios(self, cost: float, average_travel_time: float):
+        """
+        The (cost, average travel time) of a network relative to the baseline's, None if either is 0:
+        there's no network, or no itinerary has been tested.
+        """
+        return (cost / self.cost if cost and self.cost else None,
+                average_travel_time / self.average_travel_time if average_travel_time and self.average_travel_time else None)
+
+
+def euclidean_mst(locations: list):
+    """
+    The Euclidean minimum spanning tree of `locations`, as a list of (a index, b index) pairs, with
+    Borůvka's algorithm: every group of locations (each location on its own at first) is joined to
+    the closest location outside of it, until there's only one group left, in O(log n) rounds.
+    The closest location outside of a group is usually one of the BASELINE_NEIGHBOURS nearest
+    neighbours of one of its locations, the others are searched for with the SpatialIndex.
+    """
+    n = len(locations)
+    index = SpatialIndex(locations)
+    indices = {locations[i]: i for i in range(n)}
+    # The nearest neighbours of each location, closest first
+    neighbours = [[indices[other] for other in index.nearest(locations[i], BASELINE_NEIGHBOURS)]
+                  for i in range(n)]
+
+    parents = list(range(n))
+
+    def find(i):
+        # The root of the group of location i, halving the path to it on the way.
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    tree = []
+    while len(tree) < n - 1:
+        roots = [find(i) for i in range(n)]
+        groups = {}
+        for i in range(n):
+            groups.setdefault(roots[i], []).append(i)
+        # With few groups, how far each group is from the others also tells which locations can't be the closest.
+        boxes = None
+        if len(groups) <= BASELINE_BOXES_MAX_GROUPS:
+            boxes = {root: bounding_box([locations[i] for i in members])
+                     for root, members in groups.items()}
+        shortest = []
+        for root, members in groups.items():
+            best = (INFINITY, None, None)
+            # The locations whose nearest neighbours are all in the group, with how close the closest
+            # location outside of the group can be: further than the furthest neighbour.
+            searches = []
+            for i in members:
+                outside = next(
+                    (j for j in neighbours[i] if roots[j] != root), None)
+                if outside != None:
+                    best = min(best, (distance_between(
+                        locations[i], locations[outside]), i, outside))
+                else:
+                    searches.append((distance_between(
+                        locations[i], locations[neighbours[i][-1]]), i))
+            group = None
+            for bound, i in sorted(searches):
+                if bound >= best[0]:
+                    break
+                if boxes != None and min(box_distance(locations[i], box) for other_root, box in boxes.items()
+                                         if other_root != root) >= best[0]:
+                    continue
+                if group == None:
+                    group = {locations[i] for i in members}
+                other = index.nearest_not_connected(
+                    locations[i], group, best[0])
+                if other != None:
+                    best = min(best, (distance_between(
+                        locations[i], other), i, indices[other]))
+            shortest.append(best)
+        for _, i, j in sorted(shortest):
+            i_root, j_root = find(i), find(j)
+            if i_root != j_root:
+                parents[j_root] = i_root
+                tree.append((i, j))
+    return tree
+
+
+def bounding_box(locations: list):
+    return (min(loc.x for loc in locations), min(loc.y for loc in locations),
+            max(loc.x for loc in locations), max(loc.y for loc in locations))
+
+
+def box_distance(loc, box: tuple):
+    # How far `loc` is from the closest point of a (left, top, right, bottom) box.
+    left, top, right, bottom = box
+    return math.hypot(max(left - loc.x, 0, loc.x - right), max(top - loc.y, 0, loc.y - bottom))
+
+
+def tree_average_travel_time(locations: list, connections: list):
+    """
+    The average travel time of every itinerary on a tree, in O(n): the connection between a subtree
+    of s locations and the rest of the tree is crossed by the s * (n - s) itineraries between them.
+    """
+    n = len(locations)
+    if n < 2:
+        return 0
+    adjacency = [[] for _ in range(n)]
+    for a_idx, b_idx in connections:
+        length = distance_between(locations[a_idx], locations[b_idx])
+        adjacency[a_idx].append((b_idx, length))
+        adjacency[b_idx].append((a_idx, length))
+    # Visit the tree from location 0, each location after its parent.
+    parents = [None] * n
+    lengths = [0] * n
+    order = [0]
+    visited = [False] * n
+    visited[0] = True
+    for current in order:
+        for neighbour, length in adjacency[current]:
+            if not visited[neighbour]:
+                visited[neighbour] = True
+                parents[neighbour] = current
+                lengths[neighbour] = length
+                order.append(neighbour)
+
+    sizes = [1] * n
+    total_time = 0
+    for current in reversed(order):
+        if parents[current] != None:
+            crossings = sizes[current] * (n - sizes[current])
+            total_time += crossings * \
+                (CHANGE_TRAIN_TIME + lengths[current] * RAILWAY_UNIT_TRAVEL_TIME)
+            sizes[parents[current]] += sizes[current]
+    return total_time / (n * (n - 1) // 2)
@@ -0,0 +1,73 @@
+import pygame
+from game.constants import BOARD_WIDTH, BOARD_HEIGHT, HEADER_HEIGHT, MAX_ZOOM
+
+
+class Camera():
+    """
+    The part of the board shown in the window, below the header. Locations are placed in window
+    coordinates: at the default zoom of 1 the whole board is shown as is, zooming in shows a smaller
+    part of the board, bigger. The board always fills the window.
+    """
+
+    def __init__(self):
+        # The part of the window showing the board, which is also where the board is at zoom 1
+        self.viewport = pygame.Rect(0, HEADER_HEIGHT, BOARD_WIDTH, BOARD_HEIGHT)
+        # How many pixels of the window a pixel of the board takes
+        self.zoom = 1
+        # The point of the board shown in the top left corner of the viewport
+        self.left = self.viewport.left
+        self.top = self.viewport.top
+
+    def view(self):
+        return (self.zoom, self.left, self.top)
+
+    def moved(self):
+        return self.view() != (1, self.viewport.left, self.viewport.top)
+
+    def to_screen(self, x: float, y: float):
+        return ((x - self.left) * self.zoom + self.viewport.left,
+                (y - self.top) * self.zoom + self.viewport.top)
+
+    def to_board(self, x: float, y: float):
+        return (self.left + (x - self.viewport.left) / self.zoom,
+                self.top + (y - self.viewport.top) / self.zoom)
+
+    def visible_area(self, margin: float = 0):
+        """
+        The part of the board on screen as (left, top, right, bottom), extended by `margin` pixels of the window.
+        """
+        margin /= self.zoom
+        return (self.left - margin, self.top - margin,
+                self.left + self.viewport.width / self.zoom + margin,
+                self.top + self.viewport.height / self.zoom + margin)
+
+    def zoom_at(self, factor: float, pos: tuple):
+        """
+        Zoom in (`factor` > 1) or out, the point of the board at `pos` in the window staying there.
+        """
+        x, y = self.to_board(*pos)
+        # Rounded, so that zooming in and out again gets back to the same zoom
+        self.zoom = round(min(max(self.zoom * factor, 1), MAX_ZOOM), 6)
+        self.left = x - (pos[0] - self.viewport.left) / self.zoom
+        self.top = y - (pos[1] - self.viewport.top) / self.zoom
+        self.__clamp()
+
+    def pan(self, dx: float, dy: float):
+        """
+        Move the board by (`dx`, `dy`) pixels of the window.
+        """
+        self.left -= dx / self.zoom
+        self.top -= dy / self.zoom
+        self.__clamp()
+
+    def reset(self):
+        self.zoom = 1
+        self.left = self.viewport.left
+        self.top = self.viewport.top
+
+    def __clamp(self):
+        # Never show anything beyond the edges of the board.
+        self.left = min(max(self.left, self.viewport.left),
+                        self.viewport.right - self.viewport.width / self.zoom)
+        self.top = min(max(self.top, self.viewport.top),
+                       self.viewport.bottom - self.viewport.height / self.zoom)
@@ -4,11 +4,67 @@ WINDOW_WIDTH = 1080
 WINDOW_HEIGHT = 620
 
 UOM_LOGO_PATH = 'assets/uom_logo.png'
+ROUTER_PATH = 'router.py'
+
+# Above this many locations, the header doesn't show the average travel time while connections are added
+DYNAMIC_PATHS_MAX_LOCATIONS = 200
+
+# The performance overlay (key F3)
+PERFORMANCE_OVERLAY_SIZE = (240, 240)
+PERFORMANCE_REFRESH_MS = 250
+
+# The heat map (key H): the color of connections from the least to the most used ones
+HEAT_COLORS = [
+    pygame.Color(255, 214, 51),
+    pygame.Color(255, 176, 51),
+    pygame.Color(255, 144, 51),
+    pygame.Color(255, 110, 51),
+    pygame.Color(255, 51, 51),
+    pygame.Color(214, 20, 40),
+    pygame.Color(170, 0, 30),
+    pygame.Color(120, 0, 20),
+]
+
+# Above this many parts of the window changing at once (connections added or changing color),
+# the whole window is redrawn
+MAX_DIRTY_RECTS = 200
+
+# The camera: the mouse wheel or + and - zoom, dragging the board pans and 0 shows the whole board.
+MAX_ZOOM = 16
+ZOOM_STEP = 1.25
+# Far out, locations are dots and connections thin lines. The names of the locations are only shown
+# once zoomed in enough for about this many locations to be on screen.
+LABELS_MAX_LOCATIONS = 150
+# How far from its location (in pixels) the name of a location can be drawn
+LABEL_MARGIN = 100
+
+# How often the router file is checked for changes with --watch (in milliseconds)
+WATCH_INTERVAL_MS = 500
+
+# The height of the timeline shown when playing a replay
+TIMELINE_HEIGHT = 8
+# At least how many events of a replay are played between two checkpoints seeking starts from
+REPLAY_CHECKPOINT_EVENTS = 256
+
+# Where the scaled pictures are stored between launches
+ASSET_CACHE_DIR = '.cache/assets'
+# How many scaled pictures are kept in memory
+ASSET_CACHE_CAPACITY = 16
 UOM_MAIN_COLOR = (80, 0, 127)
 
-TICKS_STARTUP = 100
-TICKS_CONNECTIONS = 300
-SHOW_CONNECTION_DELAY = 25
+FPS = 60
+
+# Animation delays at normal speed (in milliseconds)
+STARTUP_DELAY_MS = 1500
+ADD_CONNECTION_DELAY_MS = 150
+SHOW_CONNECTION_DELAY_MS = 200
+
+# The animation speed associated with each key
+SPEED_KEYS = {
+    pygame.K_1: 1,
+    pygame.K_2: 4,
+    pygame.K_3: 16,
+}
 
 #### KPI CONSTANTS #################################
 # The cost of a connection
@@ -25,6 +81,8 @@ CHANGE_TRAIN_TIME = 2
 HEADER_HEIGHT = 80
 HEADER_WIDTH = WINDOW_HEIGHT
 HEADER_LINE_WIDTH = 2
+# Horizontal position of each KPI in the header
+KPI_OFFSETS = (500, 670, 820)
 
 # 1000 x 620
 BOARD_HEIGHT = WINDOW_HEIGHT - HEADER_HEIGHT
@@ -0,0 +1,370 @@
+from collections import deque
+from game.baseline import Baseline
+from game.constants import *
+from game.level import iter_locations
+from game.parallel import PARALLEL_MIN_ITINERARIES, parallel_paths
+from game.profiler import Profiler
+from game.utils import INFINITY, Location, LocationGraph, Connection, Itineraries, SpatialIndex
+import importlib.util
+import inspect
+import math
+import os
+import threading
+
+
+class Evaluation():
+    """
+    Runs the student's algorithm on a level and computes the KPIs of the resulting network.
+    Nothing is drawn here, the game window (cf game/state.py) animates the same computations.
+    """
+
+    def __init__(self, config: dict, router, sandbox=None, profiler=None, recorder=None, jobs: int = 1):
+        # Game configuration
+        self.config = config
+        # The student's `connect_locations` function
+        self.router = router
+        # Runs the student's algorithm in another process instead (cf game/sandbox.py)
+        self.sandbox = sandbox
+        # Why the student's algorithm failed, if it did
+        self.router_error = ''
+        # Measures how long each phase takes (cf game/profiler.py)
+        self.profiler = profiler if profiler != None else Profiler()
+        # Records the evaluation to play it back later (cf game/replay.py)
+        self.recorder = recorder
+        # How many processes test the remaining itineraries at once (cf test_all_itineraries)
+        self.jobs = jobs
+        # Temporary list of connections (used to animate connections)
+        self.connections_buffer = deque()
+        # Every connection the student's algorithm created so far (used to ignore duplicates)
+        self.connections_created = set()
+        # The cost of the network
+        self.cost = 0
+        # The congestion rating
+        self.traffic_congestion = 0
+        # The total number of itineraries that have been tested.
+        self.num_travels = 0
+        # The total travel time of all the itineraries that have been tested.
+        self.total_travel_time_mins = 0
+        # The number of itineraries with no path from A to B.
+        self.num_disconnected = 0
+        # Used to display errors
+        self.network_error = ''
+        # The itineraries the system hasn't evaluated yet (cf Itineraries).
+        self.itineraries_to_test = None
+        # The network the KPIs are compared to (cf game/baseline.py), kept when evaluating again
+        self.baseline = None
+
+        self.load_config()
+
+        # The graph representing our railway network
+        self.graph = LocationGraph(self.locations)
+
+        self.init_itineraries()
+
+        if self.recorder != None:
+            self.recorder.begin(self)
+
+    def restart(self):
+        """
+        Forget the network and its KPIs, to evaluate the student's algorithm again on the same level.
+        """
+        self.router_error = ''
+        self.connections_buffer = deque()
+        self.connections_created = set()
+        self.cost = 0
+        self.traffic_congestion = 0
+        self.num_travels = 0
+        self.total_travel_time_mins = 0
+        self.num_disconnected = 0
+        self.network_error = ''
+        self.graph = LocationGraph(self.locations)
+        self.init_itineraries()
+
+    def init_itineraries(self):
+        """
+        Initializes the intineraries we're going to test (aka all of them).
+        They're generated as they're tested, not stored.
+        """
+        self.itineraries_to_test = Itineraries(self.graph)
+
+    def load_config(self):
+        """
+        Load the locations from the config file into an array to manipulate them easier.
+        """
+        self.locations = []
+        for x, y, name, color in iter_locations(self.config):
+            self.locations.append(
+                Location(x, y + HEADER_HEIGHT, name, color))
+
+    def connect_locations(self):
+        """
+        Invoke the student's algorithm. Store all the connections it created in a buffer.
+        In a sandbox, the algorithm keeps running in the background (cf receive_connections).
+        If it fails, the error is reported as in a sandbox, and the connections it created are kept.
+        """
+        if self.sandbox != None:
+            self.sandbox.start(self.locations)
+            return
+        with self.profiler.span('router'):
+            try:
+                invoke_router(self.router, self.locations,
+                              self.connect_handler)
+            except Exception as e:
+                self.router_error = f'Router failed: {type(e).__name__}: {e}'
+
+    def score_baseline(self):
+        """
+        Compute the baseline of the level once, the KPIs are then shown as ratios against it.
+        """
+        if self.baseline == None:
+            with self.profiler.span('baseline'):
+                self.baseline = Baseline(self.locations)
+
+    def receive_connections(self, wait: bool = False):
+        """
+        Store the connections the sandboxed algorithm created since the last call in the buffer.
+        If `wait` is True, wait for the algorithm to return.
+        """
+        if self.sandbox == None:
+            return
+        received = self.sandbox.wait() if wait else self.sandbox.receive()
+        for a_idx, b_idx in received:
+            self.connect_handler(self.locations[a_idx], self.locations[b_idx])
+        if self.sandbox.error:
+            self.router_error = self.sandbox.error
+
+    def routing(self):
+        """
+        Is the student's algorithm still creating connections.
+        """
+        return self.sandbox != None and self.sandbox.running
+
+    def connect_handler(self, a, b):
+        """
+        This function is called by the student's algorithm.
+        """
+        # We don't want want to connect a location to itself
+        if a == b:
+            return
+        # We don't want to connect stuff twice
+        con = Connection(a, b)
+        if con in self.connections_created:
+            return
+        self.connections_created.add(con)
+        # We append each student-made connection to a buffer to display connections
+        # one by one afterwards.
+        self.connections_buffer.append((a, b))
+
+    def add_next_connection(self):
+        """
+        Move the oldest connection of the buffer into the network and pay for it.
+        """
+        a, b = self.connections_buffer.popleft()
+        self.graph.add_connection(a, b)
+        #### COST ###############################################
+        self.cost += self.graph.connections[-1].distance() * \
+            RAILWAY_UNIT_COST
+        self.cost += CONNECTION_COST
+        #########################################################
+        if self.recorder != None:
+            self.recorder.record_connection(a, b)
+
+    def test_next_itinerary(self):
+        """
+        Test the next itinerary and remove it from the itineraries to test.
+        Returns the connections crossed during this commute.
+        """
+        a_idx, b_idx = next(self.itineraries_to_test)
+        itinerary = Connection(self.locations[a_idx], self.locations[b_idx])
+        directions = self.test_one_itinerary(itinerary)
+        if self.recorder != None:
+            self.recorder.record_path(itinerary, directions)
+        return directions
+
+    def test_one_itinerary(self, itinerary):
+        """
+        Test the commute from point A to point B.
+        """
+        # We get the shortest path from point A to point B.
+        with self.profiler.span('pathfind'):
+            directions = self.graph.pathfind(itinerary.a, itinerary.b)
+
+        # Maybe there's no path from A to B.
+        if directions == None:
+            self.num_disconnected += 1
+            self.network_error = "Some locations aren't connected"
+            return None
+
+        with self.profiler.span('kpi update'):
+            self.update_traffic_congestion()
+
+            ###### Average Travel Time ############################
+            # Each stop takes CHANGE_TRAIN_TIME mins.
+            # Travelling a pixel on screen costs RAILWAY_UNIT_TRAVEL_TIME.
+            # The length is summed from A to B, as test_all_itineraries gets it from the pathfinding.
+            self.num_travels += 1
+            self.total_travel_time_mins += len(
+                directions) * CHANGE_TRAIN_TIME
+            length = 0
+            for i in range(len(directions)):
+                length += directions[i].distance()
+            self.total_travel_time_mins += length * RAILWAY_UNIT_TRAVEL_TIME
+            #######################################################
+
+        return directions
+
+    def test_all_itineraries(self, stopping=None):
+        """
+        Test every remaining itinerary, one batch of itineraries with the same start at a time
+        (cf LocationGraph.paths_from). Gives the same KPIs as testing them one by one with test_next_itinerary.
+        With several jobs, batches are spread over as many processes (cf game/parallel.py), with the same results.
+        Stops between two batches once `stopping` is set (cf run).
+        """
+        batches = self.itineraries_to_test.batches()
+        if self.jobs > 1 and len(self.itineraries_to_test) >= PARALLEL_MIN_ITINERARIES:
+            paths = parallel_paths(self.graph, batches, self.jobs)
+        else:
+            paths = self.paths(batches)
+
+        tested = False
+        for targets, distances, hops, crossings in paths:
+            if stopping != None and stopping.is_set():
+                break
+            self.graph.use(crossings)
+            for i in range(len(targets)):
+                # Maybe there's no path from A to B.
+                if distances[i] == INFINITY:
+                    self.num_disconnected += 1
+                    self.network_error = "Some locations aren't connected"
+                    continue
+                tested = True
+                ###### Average Travel Time ############################
+                self.num_travels += 1
+                self.total_travel_time_mins += hops[i] * CHANGE_TRAIN_TIME
+                self.total_travel_time_mins += distances[i] * \
+                    RAILWAY_UNIT_TRAVEL_TIME
+                #######################################################
+
+        # Untested itineraries don't change the load of any connection.
+        if tested:
+            self.update_traffic_congestion()
+
+    def paths(self, batches):
+        # The shortest paths of each batch of itineraries: the targets, the distance and hops of each
+        # target, and the connections crossed.
+        for a_idx, targets in batches:
+            with self.profiler.span('all pairs'):
+                distances, hops, crossings = self.graph.paths_from(
+                    a_idx, targets)
+            yield targets, [distances[b_idx] for b_idx in targets], [hops[b_idx] for b_idx in targets], crossings
+
+    def update_traffic_congestion(self):
+        ###### Traffic Congestion #############################
+        # We check how often each connection has been used and
+        # we calculate the variance of this data.
+        # The graph keeps it up to date as connections get used.
+        self.traffic_congestion = self.graph.loads.variance()
+        #######################################################
+
+    def run(self, stopping=None):
+        """
+        Place every connection and test every itinerary at once, without any animation.
+        Returns early once `stopping`, an Event set from another thread (cf game/worker.py), is set.
+        """
+        if stopping == None:
+            stopping = threading.Event()
+        self.receive_connections(wait=True)
+        while len(self.connections_buffer) and not stopping.is_set():
+            self.add_next_connection()
+        if stopping.is_set():
+            return self
+        if self.recorder != None:
+            # The recording needs the path of each itinerary.
+            while len(self.itineraries_to_test) and not stopping.is_set():
+                self.test_next_itinerary()
+        else:
+            self.test_all_itineraries(stopping)
+        return self
+
+    def average_travel_time(self):
+        if self.num_travels == 0:
+            return 0
+        return self.total_travel_time_mins / self.num_travels
+
+    def ratios(self):
+        """
+        The (cost, average travel time) of the network relative to the baseline's, None if they aren't known.
+        """
+        if self.baseline == None:
+            return None, None
+        return self.baseline.ratios(self.cost, self.average_travel_time())
+
+    def kpis(self):
+        """
+        The KPIs as they are displayed to the player: a list of (title, value) pairs.
+        """
+        cost_ratio, travel_time_ratio = self.ratios()
+        return [
+            ('Average Travel Time', str(
+                math.floor(self.average_travel_time())) + 'min' + format_ratio(travel_time_ratio)),
+            ('Cost', str(math.floor(self.cost)) + 'mi$' + format_ratio(cost_ratio)),
+            ('Traffic congestion', f'{self.traffic_congestion:.2f}'),
+        ]
+
+    def results(self):
+        """
+        The raw KPIs of the network, used to compare networks with each other.
+        """
+        cost_ratio, travel_time_ratio = self.ratios()
+        return {
+            'name': self.config['name'],
+            'cost': self.cost,
+            'average_travel_time': self.average_travel_time(),
+            'traffic_congestion': self.traffic_congestion,
+            'connections': len(self.graph.connections),
+            'itineraries': self.num_travels,
+            'disconnected_itineraries': self.num_disconnected,
+            'network_error': self.network_error,
+            'router_error': self.router_error,
+            'baseline_cost': self.baseline.cost if self.baseline != None else None,
+            'baseline_average_travel_time': self.baseline.average_travel_time if self.baseline != None else None,
+            'cost_ratio': cost_ratio,
+            'travel_time_ratio': travel_time_ratio,
+        }
+
+
+def format_ratio(ratio: float):
+    # How a KPI compares to the baseline, next to its value.
+    return f' ({ratio:.2f}x)' if ratio else ''
+
+
+def invoke_router(router, locations: list, connect):
+    """
+    Call the student's algorithm. Algorithms with an `index` parameter also get a SpatialIndex of the locations.
+    """
+    if 'index' in inspect.signature(router).parameters:
+        router(locations, connect, index=SpatialIndex(locations))
+    else:
+        router(locations, connect)
+
+
+def load_router(path: str):
+    """
+    Import the `connect_locations` function of a python file.
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(
+        'router_' + name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.connect_locations
+
+
+def evaluate(config: dict, router, sandbox=None, profiler=None, recorder=None, jobs: int = 1):
+    """
+    Evaluate the student's algorithm on a level as fast as possible.
+    """
+    evaluation = Evaluation(config, router, sandbox, profiler, recorder, jobs)
+    evaluation.connect_locations()
+    evaluation.score_baseline()
+    return evaluation.run()
@@ -0,0 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor
+from game.evaluate import evaluate, load_router
+from game.level import load_level
+from game.replay import Recorder
+from game.sandbox import SandboxedRouter
+import csv
+import json
+import os
+import time
+
+LEADERBOARD_COLUMNS = [
+    'level',
+    'submission',
+    'cost',
+    'average_travel_time',
+    'traffic_congestion',
+    'cost_ratio',
+    'travel_time_ratio',
+    'connections',
+    'disconnected_itineraries',
+    'seconds',
+    'error',
+]
+
+
+class RouterError(Exception):
+    """
+    The submission failed, the message is the router error of the evaluation.
+    """
+
+
+def find_submissions(directory: str):
+    """
+    Every submission in `directory`: either a python file, or a folder with a router.py file.
+    Returns a list of (name, path to the router) sorted by name.
+    """
+    submissions = []
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isfile(path) and entry.endswith('.py'):
+            submissions.append((entry[:-3], path))
+        elif os.path.isfile(os.path.join(path, 'router.py')):
+            submissions.append((entry, os.path.join(path, 'router.py')))
+    return submissions
+
+
+def grade_submission(name: str, router_path: str, level_path: str, time_limit: float = None, memory_limit: int = None,
+                     replay_dir: str = None):
+    """
+    Evaluate one submission on one level. Runs inside a worker process.
+    With a time or memory limit, the submission runs in a sandbox (cf game/sandbox.py).
+    With a `replay_dir`, the evaluation is recorded there (cf replay_path).
+    """
+    row = {column: '' for column in LEADERBOARD_COLUMNS}
+    row['submission'] = name
+    started_at = time.perf_counter()
+    recorder = None
+    if replay_dir != None:
+        recorder = Recorder(replay_path(replay_dir, name, level_path))
+    try:
+        config = load_level(level_path)
+        row['level'] = config['name']
+        if time_limit != None or memory_limit != None:
+            results = evaluate(config, None, SandboxedRouter(
+                router_path, time_limit, memory_limit), recorder=recorder).results()
+        else:
+            try:
+                router = load_router(router_path)
+            except Exception as e:
+                # As reported when the sandbox loads it
+                raise RouterError(f'Router failed: {type(e).__name__}: {e}')
+            results = evaluate(config, router, recorder=recorder).results()
+        if results['router_error']:
+            raise RouterError(results['router_error'])
+        for column in LEADERBOARD_COLUMNS:
+            if column in results:
+                row[column] = results[column]
+    except RouterError as e:
+        # The network of a failed submission isn't graded, whether it ran in a sandbox or not.
+        row['error'] = str(e)
+    except Exception as e:
+        # A broken submission shouldn't stop the grading of the others.
+        row['level'] = row['level'] or level_path
+        row['error'] = f'{type(e).__name__}: {e}'
+    if recorder != None:
+        recorder.close()
+    row['seconds'] = time.perf_counter() - started_at
+    return row
+
+
+def replay_path(replay_dir: str, name: str, level_path: str):
+    """
+    Where the evaluation of submission `name` on a level is recorded: <replay_dir>/<name>-<level>.bin
+    """
+    level = os.path.splitext(os.path.basename(level_path))[0]
+    return os.path.join(replay_dir, f'{name}-{level}.bin')
+
+
+def grade(submissions: list, level_paths: list, jobs: int = None, time_limit: float = None, memory_limit: int = None,
+          replay_dir: str = None):
+    """
+    Evaluate every submission on every level, spreading the work over `jobs` processes
+    (one per core by default). Returns the leaderboard: one row per (submission, level),
+    best networks of each level first.
+    """
+    if replay_dir != None:
+        os.makedirs(replay_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(grade_submission, name, router_path, level_path, time_limit, memory_limit,
+                                   replay_dir)
+                   for name, router_path in submissions
+                   for level_path in level_paths]
+        rows = [future.result() for future in futures]
+    # Broken networks come last, then those leaving the most itineraries disconnected, then the cheapest first.
+    rows.sort(key=lambda row: (row['level'], row['error'] != '', row['disconnected_itineraries'] or 0,
+                               row['cost'] or 0, row['submission']))
+    return rows
+
+
+def write_leaderboard(rows: list, path: str):
+    """
+    Write the leaderboard as CSV, or as JSON if `path` ends with .json.
+    """
+    with open(path, 'w', newline='') as stream:
+        if path.endswith('.json'):
+            json.dump(rows, stream, indent=4)
+        else:
+            writer = csv.DictWriter(stream, fieldnames=LEADERBOARD_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
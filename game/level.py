@@ -0,0 +1,183 @@
+from array import array
+import json
+import mmap
+import struct
+import sys
+
+# Compiled levels start with these bytes, followed by the format version.
+COMPILED_LEVEL_MAGIC = b'RPLV'
+COMPILED_LEVEL_VERSION = 1
+# The last field of the header is for flags, none are defined yet.
+
+HEADER = struct.Struct('<4sIII')
+ALIGNMENT = 8
+LENGTH = struct.Struct('<I')
+
+
+def load_level(path: str):
+    """
+    Load a level, either a JSON file or a compiled level (cf compile_level).
+    """
+    with open(path, 'rb') as stream:
+        compiled = stream.read(len(COMPILED_LEVEL_MAGIC)) == COMPILED_LEVEL_MAGIC
+    if compiled:
+        return load_compiled_level(path)
+    with open(path, 'r') as stream:
+        return json.load(stream)
+
+
+def iter_locations(config: dict):
+    """
+    The (x, y, name, color) of each location of a level.
+    """
+    locations = config['locations']
+    if isinstance(locations, CompiledLocations):
+        return locations.tuples()
+    return ((loc['x'], loc['y'], loc['name'], loc['color']) for loc in locations)
+
+
+class CompiledLocations():
+    """
+    The locations of a compiled level, stored in contiguous arrays.
+    Each location can still be read as a dict, like in a JSON level.
+    """
+
+    def __init__(self, xs, ys, color_indices, colors: list, name_offsets, names: bytes):
+        self.xs = xs
+        self.ys = ys
+        self.color_indices = color_indices
+        self.colors = colors
+        self.name_offsets = name_offsets
+        self.names = names
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __getitem__(self, i: int):
+        x, y, name, color = self.location(i)
+        return {'name': name, 'x': x, 'y': y, 'color': color}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def location(self, i: int):
+        return (self.xs[i], self.ys[i], self.name(i), self.colors[self.color_indices[i]])
+
+    def name(self, i: int):
+        return str(self.names[self.name_offsets[i]:self.name_offsets[i + 1]], 'utf-8')
+
+    def tuples(self):
+        names = str(self.names, 'utf-8') if self.names.isascii() else None
+        for i in range(len(self)):
+            if names != None:
+                # Offsets are in bytes, which are characters for ASCII names.
+                name = names[self.name_offsets[i]:self.name_offsets[i + 1]]
+            else:
+                name = self.name(i)
+            yield (self.xs[i], self.ys[i], name, self.colors[self.color_indices[i]])
+
+
+def compile_level(config: dict, path: str):
+    """
+    Write a level in the compiled format: coordinates in contiguous int32 arrays and each color
+    stored once.
+    """
+    n = len(config['locations'])
+    colors = []
+    color_table = {}
+    xs = array('i')
+    ys = array('i')
+    color_indices = array('H')
+    name_offsets = array('I', [0])
+    names = bytearray()
+    for x, y, name, color in iter_locations(config):
+        if x != int(x) or y != int(y):
+            raise ValueError('compiled levels only support integer coordinates')
+        xs.append(int(x))
+        ys.append(int(y))
+        if color not in color_table:
+            color_table[color] = len(colors)
+            colors.append(color)
+        color_indices.append(color_table[color])
+        names += name.encode('utf-8')
+        name_offsets.append(len(names))
+
+    with open(path, 'wb') as stream:
+        stream.write(HEADER.pack(COMPILED_LEVEL_MAGIC, COMPILED_LEVEL_VERSION,
+                     n, 0))
+        write_string(stream, config['name'])
+        write_string(stream, config.get('background_path', ''))
+        stream.write(LENGTH.pack(len(colors)))
+        for color in colors:
+            write_string(stream, color)
+        for values in (xs, ys, color_indices, name_offsets):
+            write_array(stream, values)
+        stream.write(names)
+
+
+def load_compiled_level(path: str):
+    """
+    Load a compiled level. The file is memory-mapped: nothing is parsed location by location.
+    """
+    with open(path, 'rb') as stream:
+        data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+    magic, version, n, flags = HEADER.unpack_from(view, 0)
+    if version != COMPILED_LEVEL_VERSION:
+        raise ValueError(f'unsupported compiled level version {version}')
+    offset = HEADER.size
+    name, offset = read_string(view, offset)
+    background_path, offset = read_string(view, offset)
+    (num_colors,), offset = LENGTH.unpack_from(view, offset), offset + LENGTH.size
+    colors = []
+    for _ in range(num_colors):
+        color, offset = read_string(view, offset)
+        colors.append(color)
+    xs, offset = read_array(view, offset, 'i', n)
+    ys, offset = read_array(view, offset, 'i', n)
+    color_indices, offset = read_array(view, offset, 'H', n)
+    name_offsets, offset = read_array(view, offset, 'I', n + 1)
+    names = bytes(view[offset:offset + name_offsets[n]])
+    offset += name_offsets[n]
+
+    return {
+        'name': name,
+        'background_path': background_path,
+        'locations': CompiledLocations(xs, ys, color_indices, colors, name_offsets, names),
+    }
+
+
+def write_string(stream, text: str):
+    encoded = text.encode('utf-8')
+    stream.write(LENGTH.pack(len(encoded)))
+    stream.write(encoded)
+
+
+def read_string(view: memoryview, offset: int):
+    (length,) = LENGTH.unpack_from(view, offset)
+    offset += LENGTH.size
+    return str(view[offset:offset + length], 'utf-8'), offset + length
+
+
+def write_array(stream, values: array):
+    # Arrays start on a multiple of 8 bytes, so they can be used straight from the file.
+    stream.write(bytes(-stream.tell() % ALIGNMENT))
+    # Compiled levels are little-endian.
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    stream.write(values.tobytes())
+
+
+def read_array(view: memoryview, offset: int, typecode: str, count: int):
+    offset += -offset % ALIGNMENT
+    size = array(typecode).itemsize * count
+    chunk = view[offset:offset + size]
+    if sys.byteorder == 'little':
+        # Straight from the memory-mapped file, without any copy.
+        return chunk.cast(typecode), offset + size
+    values = array(typecode, bytes(chunk))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values, offset + size
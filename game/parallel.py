@@ -0,0 +1,208 @@
+from array import array
+from collections import deque
+from game.utils import INFINITY, PATH_TIE_TOLERANCE
+from multiprocessing import shared_memory
+import heapq
+import itertools
+import multiprocessing
+
+# Below this many itineraries, starting the worker processes takes longer than testing them.
+PARALLEL_MIN_ITINERARIES = 100_000
+# How many starts each task sent to a worker covers
+PARALLEL_CHUNK = 16
+
+
+class SharedGraph():
+    """
+    The adjacency of a LocationGraph as flat CSR arrays in shared memory, so that worker processes can
+    read the network without it being copied to each of them. The entries of location i are at positions
+    offsets[i] to offsets[i + 1] of the neighbours, lengths and connections arrays, in the same order
+    as in LocationGraph.adjacency, connections being indices in LocationGraph.connections.
+    The coordinates of location i are xs[i] and ys[i], for the A* heuristic.
+    """
+
+    def __init__(self, graph):
+        connection_indices = {id(con): i for i,
+                              con in enumerate(graph.connections)}
+        offsets = array('q', [0])
+        neighbours = array('q')
+        lengths = array('d')
+        connections = array('q')
+        for entries in graph.adjacency:
+            for neighbour, con, length in entries:
+                neighbours.append(neighbour)
+                lengths.append(length)
+                connections.append(connection_indices[id(con)])
+            offsets.append(len(neighbours))
+        # The number of locations and of adjacency entries, to find the arrays in the shared block
+        self.sizes = (len(graph.adjacency), len(neighbours))
+
+        xs = array('d', (loc.x for loc in graph.locations))
+        ys = array('d', (loc.y for loc in graph.locations))
+        arrays = (offsets, neighbours, lengths, connections, xs, ys)
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=max(1, sum(len(values) * values.itemsize for values in arrays)))
+        offset = 0
+        for values in arrays:
+            size = len(values) * values.itemsize
+            self.memory.buf[offset:offset + size] = values.tobytes()
+            offset += size
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+def parallel_paths(graph, batches, jobs: int):
+    """
+    The same as graph.paths_from(a index, targets) for each (a index, targets) of `batches`, spread over
+    `jobs` processes. Yields (targets, distances, hops, crossings) in the order of `batches`, with the
+    distance and hops of each target in the order of `targets`. Connections aren't used (cf LocationGraph.use).
+    """
+    shared = SharedGraph(graph)
+    try:
+        with multiprocessing.Pool(jobs, initializer=attach_graph, initargs=(shared.memory.name, shared.sizes)) as pool:
+            chunks = iter(lambda: list(itertools.islice(
+                batches, PARALLEL_CHUNK)), [])
+            for results in pool.imap(paths_from_chunk, chunks):
+                for targets, distances, hops, connections, counts in results:
+                    yield targets, distances, hops, [(graph.connections[i], count)
+                                                     for i, count in zip(connections, counts)]
+    finally:
+        shared.close()
+
+
+#### WORKER PROCESSES ##############################
+
+# The shared graph, as seen by a worker process: (memory, offsets, neighbours, lengths, connections, xs, ys)
+worker_graph = None
+
+
+def attach_graph(name: str, sizes: tuple):
+    global worker_graph
+    num_locations, num_entries = sizes
+    memory = shared_memory.SharedMemory(name=name)
+    views = []
+    offset = 0
+    for typecode, count in (('q', num_locations + 1), ('q', num_entries), ('d', num_entries), ('q', num_entries),
+                            ('d', num_locations), ('d', num_locations)):
+        size = count * 8
+        views.append(memory.buf[offset:offset + size].cast(typecode))
+        offset += size
+    worker_graph = (memory, *views)
+
+
+def paths_from_chunk(chunk: list):
+    return [paths_from(a_idx, targets) for a_idx, targets in chunk]
+
+
+def paths_from(source: int, targets):
+    """
+    LocationGraph.paths_from on the shared graph: the same Dijkstra, exploring in the same order,
+    and the same A* for the targets another path is as short to, so that the paths are the same.
+    """
+    _, offsets, neighbours, lengths, connections, _, _ = worker_graph
+    n = len(offsets) - 1
+    distances = [INFINITY] * n
+    hops = [0] * n
+    predecessors = [None] * n
+    via = [None] * n
+    order = []
+    distances[source] = 0
+    open = [(0, source)]
+    while len(open) > 0:
+        current_distance, current = heapq.heappop(open)
+        if current_distance > distances[current]:
+            continue
+        order.append(current)
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbour = neighbours[k]
+            tentative_distance = current_distance + lengths[k]
+            if tentative_distance < distances[neighbour]:
+                distances[neighbour] = tentative_distance
+                hops[neighbour] = hops[current] + 1
+                predecessors[neighbour] = current
+                via[neighbour] = connections[k]
+                heapq.heappush(open, (tentative_distance, neighbour))
+
+    tied = ties(distances, predecessors, order)
+    below = [0] * n
+    crossed = array('q')
+    counts = array('q')
+    for target in targets:
+        if not tied[target]:
+            below[target] += 1
+            continue
+        directions = astar(source, target)
+        length = 0
+        for k in directions:
+            length += lengths[k]
+            crossed.append(connections[k])
+            counts.append(1)
+        distances[target] = length
+        hops[target] = len(directions)
+    for current in reversed(order):
+        if below[current] and via[current] != None:
+            crossed.append(via[current])
+            counts.append(below[current])
+            below[predecessors[current]] += below[current]
+    return (targets, array('d', [distances[target] for target in targets]),
+            array('q', [hops[target] for target in targets]), crossed, counts)
+
+
+def ties(distances: list, predecessors: list, order: list):
+    # LocationGraph.__ties on the shared graph
+    _, offsets, neighbours, lengths, _, _, _ = worker_graph
+    tied = [False] * len(distances)
+    for current in order[1:]:
+        predecessor = predecessors[current]
+        if tied[predecessor]:
+            tied[current] = True
+            continue
+        longest = distances[current] * (1 + PATH_TIE_TOLERANCE)
+        for k in range(offsets[current], offsets[current + 1]):
+            if neighbours[k] != predecessor and distances[neighbours[k]] + lengths[k] <= longest:
+                tied[current] = True
+                break
+    return tied
+
+
+def astar(start: int, end: int):
+    """
+    LocationGraph.__astar on the shared graph, exploring in the same order. Returns the positions of
+    the adjacency entries along the path from `start` to `end`, None if there is none.
+    """
+    _, offsets, neighbours, lengths, _, xs, ys = worker_graph
+
+    def distance(i: int):
+        # The same formula as distance_between, for the same rounding.
+        return ((((xs[end] - xs[i])**2) + ((ys[end] - ys[i])**2))**0.5)
+
+    g_score = {start: 0}
+    came_from = {}
+    positions = {start: 0}
+    entered = 0
+    open = [(distance(start), 0, start, 0)]
+    while len(open) > 0:
+        _, _, current, current_g = heapq.heappop(open)
+        if current_g > g_score[current]:
+            continue
+        if current == end:
+            directions = deque()
+            while current in came_from:
+                current, k = came_from[current]
+                directions.appendleft(k)
+            return list(directions)
+        del positions[current]
+        for k in range(offsets[current], offsets[current + 1]):
+            neighbour = neighbours[k]
+            tentative_g_score = current_g + lengths[k]
+            if tentative_g_score < g_score.get(neighbour, INFINITY):
+                came_from[neighbour] = (current, k)
+                g_score[neighbour] = tentative_g_score
+                if neighbour not in positions:
+                    entered += 1
+                    positions[neighbour] = entered
+                heapq.heappush(open, (tentative_g_score + distance(neighbour),
+                                      positions[neighbour], neighbour, tentative_g_score))
+    return None
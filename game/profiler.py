@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+
+# How much each new frame weighs in the smoothed timings
+SMOOTHING = 0.1
+
+
+class Profiler():
+    """
+    Measures how long each phase of a frame takes (cf span). The smoothed timings are shown
+    in the performance overlay, and every span can be recorded in the Chrome trace event
+    format to be analysed in a trace viewer (chrome://tracing, Perfetto...). Spans can be measured
+    from several threads, each one having its own track in the trace.
+    """
+
+    def __init__(self, trace_path: str = None):
+        # Where to write the trace, if spans are recorded
+        self.trace_path = trace_path
+        # The recorded trace events
+        self.events = []
+        # The time spent in each phase during the current frame (in milliseconds)
+        self.frame = {}
+        # The smoothed time spent in each phase per frame (in milliseconds)
+        self.timings = {}
+        # The smoothed duration of a whole frame (in milliseconds)
+        self.frame_time = 0
+        # The smoothed time between two frames (in milliseconds)
+        self.frame_interval = 0
+        self.origin = time.perf_counter()
+        # Spans are recorded from the window and the evaluation worker (cf game/worker.py)
+        self.lock = threading.Lock()
+
+    def span(self, name: str):
+        """
+        Measures the code inside a `with profiler.span(name):` block.
+        """
+        return Span(self, name)
+
+    def record(self, name: str, started_at: float, ended_at: float):
+        duration_ms = (ended_at - started_at) * 1000
+        with self.lock:
+            self.frame[name] = self.frame.get(name, 0) + duration_ms
+            if self.trace_path != None:
+                self.events.append({
+                    'name': name,
+                    'ph': 'X',
+                    'ts': (started_at - self.origin) * 1_000_000,
+                    'dur': duration_ms * 1000,
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                })
+
+    def end_frame(self, started_at: float, interval_ms: float):
+        """
+        Called once the frame which started at `started_at` is done,
+        `interval_ms` after the previous frame.
+        """
+        self.record('frame', started_at, time.perf_counter())
+        with self.lock:
+            for name in self.timings.keys() | self.frame.keys():
+                self.timings[name] = self.timings.get(name, 0) * (1 - SMOOTHING) + \
+                    self.frame.get(name, 0) * SMOOTHING
+            self.frame.clear()
+        self.frame_time = self.timings['frame']
+        if self.frame_interval == 0:
+            self.frame_interval = interval_ms
+        self.frame_interval = self.frame_interval * \
+            (1 - SMOOTHING) + interval_ms * SMOOTHING
+
+    def fps(self):
+        if self.frame_interval == 0:
+            return 0
+        return 1000 / self.frame_interval
+
+    def write_trace(self):
+        if self.trace_path == None:
+            return
+        with self.lock, open(self.trace_path, 'w') as stream:
+            json.dump({'traceEvents': self.events,
+                      'displayTimeUnit': 'ms'}, stream)
+
+
+class Span():
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.profiler.record(self.name, self.started_at, time.perf_counter())
+        return False
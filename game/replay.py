@@ -0,0 +1,157 @@
+import json
+import struct
+from game.level import iter_locations, write_string, read_string
+
+# Replays start with these bytes, followed by the format version.
+REPLAY_MAGIC = b'RPRP'
+REPLAY_VERSION = 1
+
+HEADER = struct.Struct('<4sI')
+# The kinds of events
+CONNECTION = 0
+PATH = 1
+ERRORS = 2
+KIND = struct.Struct('<B')
+# A connection event: the index of both locations
+CONNECTION_EVENT = struct.Struct('<II')
+# A path event: the index of both locations and the number of connections crossed,
+# followed by the index of each of these connections (none if there's no path).
+PATH_EVENT = struct.Struct('<III')
+CONNECTION_INDEX = struct.Struct('<I')
+# The KPIs following each connection and path event: cost, traffic congestion,
+# number of travels, total travel time and number of disconnected itineraries.
+KPIS = struct.Struct('<ddIdI')
+
+
+class Recorder():
+    """
+    Records an evaluation in a compact event log: the level, each connection added to the network
+    and each itinerary tested, both followed by a snapshot of the KPIs. The log can then be played
+    back (cf ReplayState) without the student's algorithm and without any pathfinding.
+    """
+
+    def __init__(self, path: str):
+        # Where the events are written
+        self.path = path
+        # The recorded evaluation
+        self.evaluation = None
+        # The index of each connection of the network, in the order they were added
+        self.connection_indices = {}
+        # The errors as of the last event, only written when they change
+        self.errors = ('', '')
+        self.stream = None
+
+    def begin(self, evaluation):
+        """
+        Start recording `evaluation`.
+        """
+        self.evaluation = evaluation
+        level = {
+            'name': evaluation.config['name'],
+            'background_path': evaluation.config['background_path'],
+            'locations': [{'name': name, 'x': x, 'y': y, 'color': color}
+                          for x, y, name, color in iter_locations(evaluation.config)],
+        }
+        self.stream = open(self.path, 'wb')
+        self.stream.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION))
+        write_string(self.stream, json.dumps(level))
+
+    def record_connection(self, a, b):
+        """
+        Called once the connection from `a` to `b` has been added to the network.
+        """
+        graph = self.evaluation.graph
+        self.connection_indices[graph.connections[-1]] = len(
+            self.connection_indices)
+        self.__write_errors()
+        self.stream.write(KIND.pack(CONNECTION))
+        self.stream.write(CONNECTION_EVENT.pack(
+            graph.get_location_index(a), graph.get_location_index(b)))
+        self.__write_kpis()
+
+    def record_path(self, itinerary, directions):
+        """
+        Called once `itinerary` has been tested, `directions` being the connections crossed (or None).
+        """
+        graph = self.evaluation.graph
+        directions = directions or []
+        self.__write_errors()
+        self.stream.write(KIND.pack(PATH))
+        self.stream.write(PATH_EVENT.pack(graph.get_location_index(itinerary.a),
+                                          graph.get_location_index(itinerary.b), len(directions)))
+        for con in directions:
+            self.stream.write(CONNECTION_INDEX.pack(
+                self.connection_indices[con]))
+        self.__write_kpis()
+
+    def close(self):
+        if self.stream == None:
+            return
+        # The router may have failed after the last event.
+        self.__write_errors()
+        self.stream.close()
+        self.stream = None
+
+    def __write_errors(self):
+        errors = (self.evaluation.router_error, self.evaluation.network_error)
+        if errors != self.errors:
+            self.errors = errors
+            self.stream.write(KIND.pack(ERRORS))
+            for error in errors:
+                write_string(self.stream, error)
+
+    def __write_kpis(self):
+        e = self.evaluation
+        self.stream.write(KPIS.pack(e.cost, e.traffic_congestion, e.num_travels,
+                                    e.total_travel_time_mins, e.num_disconnected))
+
+
+class Replay():
+    """
+    A recorded evaluation (cf Recorder). Events are tuples:
+    (CONNECTION, a index, b index, kpis), (PATH, a index, b index, connection indices, kpis)
+    and (ERRORS, router error, network error), kpis being a (cost, traffic congestion,
+    number of travels, total travel time, number of disconnected itineraries) tuple.
+    """
+
+    def __init__(self, config: dict, events: list):
+        self.config = config
+        self.events = events
+
+
+def load_replay(path: str):
+    with open(path, 'rb') as stream:
+        data = stream.read()
+    magic, version = HEADER.unpack_from(data, 0)
+    if magic != REPLAY_MAGIC:
+        raise ValueError(f'{path} is not a replay')
+    if version != REPLAY_VERSION:
+        raise ValueError(f'unsupported replay version {version}')
+    view = memoryview(data)
+    level, offset = read_string(view, HEADER.size)
+
+    events = []
+    while offset < len(data):
+        (kind,) = KIND.unpack_from(data, offset)
+        offset += KIND.size
+        if kind == CONNECTION:
+            a_idx, b_idx = CONNECTION_EVENT.unpack_from(data, offset)
+            offset += CONNECTION_EVENT.size
+            events.append((CONNECTION, a_idx, b_idx,
+                          KPIS.unpack_from(data, offset)))
+            offset += KPIS.size
+        elif kind == PATH:
+            a_idx, b_idx, length = PATH_EVENT.unpack_from(data, offset)
+            offset += PATH_EVENT.size
+            path = struct.unpack_from(f'<{length}I', data, offset)
+            offset += length * CONNECTION_INDEX.size
+            events.append((PATH, a_idx, b_idx, path,
+                          KPIS.unpack_from(data, offset)))
+            offset += KPIS.size
+        elif kind == ERRORS:
+            router_error, offset = read_string(view, offset)
+            network_error, offset = read_string(view, offset)
+            events.append((ERRORS, router_error, network_error))
+        else:
+            raise ValueError(f'unknown replay event {kind}')
+    return Replay(json.loads(level), events)
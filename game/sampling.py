@@ -0,0 +1,259 @@
+from game.constants import *
+from game.evaluate import Evaluation
+from game.utils import INFINITY, SpatialIndex
+import math
+import random
+
+# Levels with at most this many itineraries are always evaluated exhaustively.
+SAMPLING_MIN_ITINERARIES = 50_000
+# Sampled origins are dealt into this many groups, to estimate the confidence intervals (cf update_estimates).
+SAMPLING_GROUPS = 10
+# Never stop before this many origins have been sampled.
+SAMPLING_MIN_ORIGINS = 2 * SAMPLING_GROUPS
+# The board is split into about this many cells, each sampled in proportion of its locations (cf stratified_origins).
+SAMPLING_STRATA = 64
+# The Student quantile of the 95% confidence intervals, for SAMPLING_GROUPS - 1 degrees of freedom.
+CONFIDENCE_T = 2.262
+
+
+class SampledEvaluation(Evaluation):
+    """
+    Estimates the KPIs of huge levels by only testing a random subset of the itineraries,
+    instead of all n² of them.
+
+    Itineraries are sampled by origin: a seeded random sequence of origins, each contributing every
+    itinerary that starts there, as one shortest path tree gives all of them for the price of a single
+    search. The sequence is stratified by area, so that every part of the board is sampled from the
+    first origins on. Sampling stops once the 95% confidence interval of both the average travel time and the
+    traffic congestion is within `tolerance` (relative) of the estimate, or after `max_origins` origins.
+    The number of disconnected itineraries doesn't need to be estimated: it's computed exactly from the
+    connected components of the network. Small levels are evaluated exhaustively, as in Evaluation.
+    """
+
+    def __init__(self, config: dict, router, sandbox=None, profiler=None, seed: int = 0, tolerance: float = 0.05,
+                 max_origins: int = None):
+        super().__init__(config, router, sandbox, profiler)
+        # The same seed always samples the same itineraries
+        self.rng = random.Random(seed)
+        # How close to the estimates the confidence intervals must be to stop sampling
+        self.tolerance = tolerance
+        # When to stop sampling, even if the estimates aren't precise enough (every origin by default)
+        self.max_origins = max_origins
+        # The origins left to sample, in a random order
+        self.origins = []
+        # The number of origins sampled so far
+        self.num_origins = 0
+        # For each group of origins: how many origins, the total travel time and the number of connected
+        # itineraries starting there, and how many of these itineraries cross each connection (by id).
+        self.group_origins = [0] * SAMPLING_GROUPS
+        self.group_time = [0] * SAMPLING_GROUPS
+        self.group_travels = [0] * SAMPLING_GROUPS
+        self.group_crossings = [{} for _ in range(SAMPLING_GROUPS)]
+        # The half width of the 95% confidence interval of each estimated KPI
+        self.margins = {'average_travel_time': 0, 'traffic_congestion': 0}
+
+    def init_itineraries(self):
+        """
+        Only small levels list their itineraries, the others are sampled (cf test_origin).
+        """
+        # The index of each distinct location (a location listed twice is only tested once, cf Itineraries)
+        self.distinct = sorted(self.graph.location_indices.values())
+        n = len(self.distinct)
+        self.num_itineraries = n * (n - 1) // 2
+        if not self.sampled():
+            super().init_itineraries()
+
+    def sampled(self):
+        return self.num_itineraries > SAMPLING_MIN_ITINERARIES
+
+    def run(self, stopping=None):
+        """
+        Place every connection, then sample origins until the estimates are precise enough.
+        """
+        if not self.sampled():
+            return super().run(stopping)
+        self.receive_connections(wait=True)
+        while len(self.connections_buffer):
+            self.add_next_connection()
+
+        self.count_disconnected()
+        if self.num_disconnected == self.num_itineraries:
+            # Nothing to sample.
+            return self
+        self.origins = self.stratified_origins()
+        if self.max_origins != None:
+            del self.origins[:-self.max_origins]
+        while len(self.origins):
+            # One origin per group at a time, so that every group always has about as many origins.
+            for _ in range(min(SAMPLING_GROUPS, len(self.origins))):
+                self.test_origin(self.origins.pop())
+            self.update_estimates()
+            if self.num_origins >= SAMPLING_MIN_ORIGINS and self.precise_enough():
+                break
+        return self
+
+    def stratified_origins(self):
+        """
+        The distinct locations in a random order, the first ones last (they're popped). The board is split
+        into about SAMPLING_STRATA square cells (cf SpatialIndex) and the locations of each cell are spread
+        evenly along the order, so that any number of first origins samples each cell in proportion of
+        its locations.
+        """
+        locations = [self.locations[i] for i in self.distinct]
+        width = max(loc.x for loc in locations) - min(loc.x for loc in locations)
+        height = max(loc.y for loc in locations) - min(loc.y for loc in locations)
+        index = SpatialIndex(locations, max(width, height, 1) / math.sqrt(SAMPLING_STRATA))
+        keys = []
+        for members in index.cells.values():
+            ranks = list(range(len(members)))
+            self.rng.shuffle(ranks)
+            for rank, i in zip(ranks, members):
+                keys.append(((rank + self.rng.random()) / len(members), self.distinct[i]))
+        keys.sort(reverse=True)
+        return [origin for _, origin in keys]
+
+    def count_disconnected(self):
+        """
+        Count the itineraries with no path from A to B, from the number of distinct locations in each
+        connected component.
+        """
+        visited = [False] * len(self.locations)
+        connected = 0
+        for start in self.distinct:
+            if visited[start]:
+                continue
+            visited[start] = True
+            stack = [start]
+            size = 0
+            while len(stack):
+                current = stack.pop()
+                size += 1
+                for neighbour, _, _ in self.graph.adjacency[current]:
+                    if not visited[neighbour]:
+                        visited[neighbour] = True
+                        stack.append(neighbour)
+            connected += size * (size - 1) // 2
+        self.num_disconnected = self.num_itineraries - connected
+        if self.num_disconnected:
+            self.network_error = "Some locations aren't connected"
+
+    def test_origin(self, origin: int):
+        """
+        Test every itinerary starting at location index `origin`.
+        """
+        group = self.num_origins % SAMPLING_GROUPS
+        self.num_origins += 1
+        with self.profiler.span('pathfind'):
+            distances, hops, crossings = self.graph.paths_from(origin)
+        self.group_origins[group] += 1
+        for destination in range(len(distances)):
+            if destination != origin and distances[destination] != INFINITY:
+                self.group_travels[group] += 1
+                self.group_time[group] += hops[destination] * CHANGE_TRAIN_TIME + \
+                    distances[destination] * RAILWAY_UNIT_TRAVEL_TIME
+        counts = self.group_crossings[group]
+        for con, count in crossings:
+            counts[id(con)] = counts.get(id(con), 0) + count
+
+    def update_estimates(self):
+        """
+        Estimate the KPIs of the whole network from the sampled origins. The confidence intervals
+        come from a jackknife over the groups of origins, which also removes most of the bias of the
+        congestion estimate (the variance of estimated loads is larger than the variance of the loads).
+        """
+        with self.profiler.span('kpi update'):
+            num_origins = sum(self.group_origins)
+            time = sum(self.group_time)
+            travels = sum(self.group_travels)
+            crossings = {}
+            for counts in self.group_crossings:
+                for con_id, count in counts.items():
+                    crossings[con_id] = crossings.get(con_id, 0) + count
+            estimate = self.estimate(num_origins, time, travels, crossings)
+
+            groups = [g for g in range(SAMPLING_GROUPS)
+                      if self.group_origins[g]]
+            replicates = []
+            for g in groups:
+                counts = self.group_crossings[g]
+                replicates.append(self.estimate(num_origins - self.group_origins[g], time - self.group_time[g],
+                                                travels - self.group_travels[g],
+                                                {con_id: count - counts.get(con_id, 0)
+                                                 for con_id, count in crossings.items()}))
+            # Sampling every origin gives the exact KPIs.
+            unsampled = 1 - num_origins / len(self.distinct)
+            kpis = []
+            for i, name in enumerate(('average_travel_time', 'traffic_congestion')):
+                if len(groups) < 2:
+                    kpis.append(estimate[i])
+                    continue
+                mean = sum(replicate[i]
+                           for replicate in replicates) / len(groups)
+                kpis.append(estimate[i] - unsampled *
+                            (len(groups) - 1) * (mean - estimate[i]))
+                variance = (len(groups) - 1) / len(groups) * sum((replicate[i] - mean) ** 2
+                                                                 for replicate in replicates)
+                self.margins[name] = CONFIDENCE_T * \
+                    math.sqrt(variance * unsampled)
+
+            average_travel_time, self.traffic_congestion = kpis
+            self.num_travels = self.num_itineraries - self.num_disconnected
+            self.total_travel_time_mins = average_travel_time * self.num_travels
+
+    def estimate(self, num_origins: int, time: float, travels: int, crossings: dict):
+        """
+        The (average travel time, traffic congestion) of the network, from the itineraries starting
+        at `num_origins` origins. Each itinerary is tested from both ends when every origin is sampled,
+        so a connection's load is half the number of sampled crossings, scaled to every origin.
+        """
+        average_travel_time = time / travels if travels else 0
+        num_connections = len(self.graph.connections)
+        if num_connections < 2 or num_origins == 0:
+            return average_travel_time, 0
+        scale = len(self.distinct) / (2 * num_origins)
+        total = 0
+        total_squares = 0
+        for count in crossings.values():
+            total += count * scale
+            total_squares += (count * scale) ** 2
+        return average_travel_time, (num_connections * total_squares - total * total) / \
+            (num_connections * (num_connections - 1))
+
+    def precise_enough(self):
+        return self.margins['average_travel_time'] <= self.tolerance * self.average_travel_time() and \
+            self.margins['traffic_congestion'] <= self.tolerance * \
+            self.traffic_congestion
+
+    def kpis(self):
+        """
+        The KPIs as they are displayed to the player, with the margin of the estimated ones.
+        """
+        kpis = super().kpis()
+        if not self.sampled():
+            return kpis
+        (time_title, time_value), cost, (congestion_title, congestion_value) = kpis
+        return [
+            (time_title,
+             f"{time_value} (±{self.margins['average_travel_time']:.2f})"),
+            cost,
+            (congestion_title,
+             f"{congestion_value} (±{self.margins['traffic_congestion']:.2f})"),
+        ]
+
+    def results(self):
+        results = super().results()
+        results['sampled_origins'] = self.num_origins
+        results['average_travel_time_margin'] = self.margins['average_travel_time']
+        results['traffic_congestion_margin'] = self.margins['traffic_congestion']
+        return results
+
+
+def estimate(config: dict, router, sandbox=None, profiler=None, seed: int = 0, tolerance: float = 0.05):
+    """
+    Evaluate the student's algorithm on a level, sampling the itineraries of huge levels.
+    """
+    evaluation = SampledEvaluation(
+        config, router, sandbox, profiler, seed, tolerance)
+    evaluation.connect_locations()
+    evaluation.score_baseline()
+    return evaluation.run()
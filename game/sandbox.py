@@ -0,0 +1,193 @@
+from game.evaluate import invoke_router, load_router
+from game.utils import INFINITY
+import cProfile
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: the router runs without limits there.
+    resource = None
+
+# The sandboxed router sends its connections in batches of at most this many...
+SEND_BATCH_SIZE = 256
+# ...or after this many seconds, whichever comes first.
+SEND_INTERVAL = 0.05
+
+
+class SandboxedRouter():
+    """
+    Runs a router in a separate process, with optional CPU time and memory limits, so that
+    a slow or greedy algorithm can't freeze or kill the game.
+    The connections it creates are sent back through a pipe as soon as they are created.
+    """
+
+    def __init__(self, router_path: str, time_limit: float = None, memory_limit: int = None, profile_path: str = None):
+        # The python file defining connect_locations
+        self.router_path = router_path
+        # The CPU time (in seconds) the router can use
+        self.time_limit = time_limit
+        # The memory (in bytes) the router can allocate
+        self.memory_limit = memory_limit
+        # Where to write the cProfile stats of the router
+        self.profile_path = profile_path
+        # Is the router still running
+        self.running = False
+        # Why the router stopped before returning, if it did
+        self.error = None
+        self.process = None
+        self.connection = None
+
+    def start(self, locations: list):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(target=run_router, daemon=True,
+                                               args=(self.router_path, locations, sender, self.time_limit,
+                                                     self.memory_limit, self.profile_path))
+        self.process.start()
+        sender.close()
+        self.connection = receiver
+        self.running = True
+
+    def receive(self, timeout: float = 0):
+        """
+        The (a index, b index) connections the router created since the last call.
+        Waits at most `timeout` seconds for new connections.
+        """
+        connections = []
+        while self.running and self.connection.poll(timeout):
+            try:
+                kind, value = self.connection.recv()
+            except EOFError:
+                # The process died without saying goodbye: it was killed.
+                self.process.join()
+                self.stop(self.__death_reason())
+                break
+            if kind == 'connections':
+                connections.extend(value)
+            elif kind == 'done':
+                self.stop(None)
+            elif kind == 'error':
+                self.stop(value)
+            timeout = 0
+        return connections
+
+    def wait(self):
+        """
+        Every connection the router creates until it returns.
+        """
+        connections = []
+        while self.running:
+            connections.extend(self.receive(timeout=None))
+        return connections
+
+    def kill(self):
+        """
+        Terminate the router from another thread than the one receiving its connections, which then
+        stops waiting for them (cf receive).
+        """
+        if self.running and self.process.is_alive():
+            self.process.terminate()
+
+    def stop(self, error: str):
+        self.running = False
+        self.error = error
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+    def __death_reason(self):
+        # Going over the soft CPU limit sends SIGXCPU, going over the hard one SIGKILL.
+        if self.time_limit != None and self.process.exitcode in (-getattr(signal, 'SIGXCPU', 0), -getattr(signal, 'SIGKILL', 0)):
+            return 'Router exceeded its time limit'
+        return f'Router crashed (exit code {self.process.exitcode})'
+
+
+def run_router(router_path: str, locations: list, sender, time_limit: float, memory_limit: int, profile_path: str):
+    """
+    Runs inside the sandbox process.
+    """
+    # Forked from the game window, the process would otherwise keep SDL's handler turning SIGTERM into
+    # a quit event, and couldn't be terminated.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    indices = {}
+    for i in range(len(locations)):
+        indices.setdefault(locations[i], i)
+    # The connections not sent yet, and when connections were last sent (never, so the first one is
+    # sent right away). Both are shared with the flushing thread, under the lock.
+    batch = []
+    last_sent_at = -INFINITY
+    lock = threading.Lock()
+    returned = threading.Event()
+
+    def send():
+        nonlocal last_sent_at
+        sender.send(('connections', list(batch)))
+        batch.clear()
+        last_sent_at = time.perf_counter()
+
+    def connect(a, b):
+        connection = (indices[a], indices[b])
+        with lock:
+            batch.append(connection)
+            if len(batch) >= SEND_BATCH_SIZE or time.perf_counter() - last_sent_at >= SEND_INTERVAL:
+                send()
+
+    def flush():
+        # Connections don't wait for the next call to connect, the router may not make one for a long time.
+        while not returned.wait(SEND_INTERVAL):
+            with lock:
+                if len(batch) and time.perf_counter() - last_sent_at >= SEND_INTERVAL:
+                    send()
+
+    # Started before the limits apply, the thread's stack counts as memory.
+    flusher = threading.Thread(target=flush, daemon=True)
+    flusher.start()
+    try:
+        limit_resources(time_limit, memory_limit)
+        router = load_router(router_path)
+        profiler = cProfile.Profile() if profile_path else None
+        if profiler:
+            profiler.enable()
+        try:
+            invoke_router(router, locations, connect)
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(profile_path)
+        outcome = ('done', None)
+    except MemoryError:
+        outcome = ('error', 'Router exceeded its memory limit')
+    except Exception as e:
+        outcome = ('error', f'Router failed: {type(e).__name__}: {e}')
+    returned.set()
+    flusher.join()
+    try:
+        # The connections created before the router failed are kept, as when it runs in the game's process.
+        send()
+        sender.send(outcome)
+    finally:
+        sender.close()
+
+
+def limit_resources(time_limit: float, memory_limit: int):
+    """
+    Limit the CPU time and the memory of the current process, when the platform allows it.
+    """
+    if resource == None:
+        return
+    if time_limit != None:
+        seconds = max(1, int(time_limit + 0.999))
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+    if memory_limit != None:
+        # The limit applies to the address space, on top of what the process already uses.
+        used = 0
+        if os.path.exists('/proc/self/statm'):
+            with open('/proc/self/statm', 'r') as stream:
+                used = int(stream.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        resource.setrlimit(resource.RLIMIT_AS,
+                           (used + memory_limit, used + memory_limit))
@@ -1,9 +1,29 @@
-from game.state import State
+import pygame
+from game.constants import FPS
+from game.replay import load_replay
+from game.state import State, ReplayState
 
 
-def start(config: dict):
-    state = State(config)
+def start(config: dict, speed: int = 1, uncapped: bool = False, sandbox=None, profiler=None, recorder=None,
+          jobs: int = 1, watch: bool = False):
+    play(State(config, sandbox, profiler, recorder, jobs, watch), speed, uncapped)
 
-    # Update the game every frame
+
+def start_replay(path: str, speed: int = 1, uncapped: bool = False, profiler=None):
+    play(ReplayState(load_replay(path), profiler), speed, uncapped)
+
+
+def play(state: State, speed: int, uncapped: bool):
+    state.set_speed(speed)
+    state.uncapped = uncapped
+    clock = pygame.time.Clock()
+
+    # Update the game every frame, at FPS frames per second at most
     while state.active:
-        state.update()
+        elapsed_ms = clock.tick(0 if state.uncapped else FPS)
+        state.update(elapsed_ms)
+
+    state.stop()
+    state.profiler.write_trace()
+    if state.recorder != None:
+        state.recorder.close()
@@ -1,36 +1,39 @@
+from array import array
+import math
+import os
 import pygame
+import time
 from game.assets import Assets
+from game.camera import Camera
 from game.constants import *
-from game.utils import Location, LocationGraph, Connection
+from game.evaluate import Evaluation
+from game.replay import CONNECTION, PATH, ERRORS
+from game.sandbox import SandboxedRouter
+from game.utils import LocationGraph, SpatialIndex, ConnectionIndex
+from game.worker import EvaluationWorker, Snapshot
 from router import connect_locations
-import math
-import statistics
 
 
-class State():
-    def __init__(self, config: dict):
-        # Game configuration
-        self.config = config
-        # Temporary list of connections (used to animate connections)
-        self.connections_buffer = []
+class State(Evaluation):
+    def __init__(self, config: dict, sandbox=None, profiler=None, recorder=None, jobs: int = 1, watch: bool = False):
+        if watch and sandbox == None:
+            # A router stuck in a loop can only be stopped to evaluate the next version if it runs in a sandbox.
+            sandbox = SandboxedRouter(ROUTER_PATH)
+        super().__init__(config, connect_locations, sandbox, profiler, recorder, jobs)
+        # The header shows what the network connects while it's being built.
+        self.graph.track_paths(DYNAMIC_PATHS_MAX_LOCATIONS)
         # Is the game running
         self.active = True
         # The game assets
         self.assets = Assets(config["background_path"])
-        # The cost of the network
-        self.cost = 0
-        # The congestion rating
-        self.traffic_congestion = 0
-        # The total number of itineraries that have been tested.
-        self.num_travels = 0
-        # The total travel time of all the itineraries that have been tested.
-        self.total_travel_time_mins = 0
-        # The timer used to animate stuff
+        # The time used to animate stuff (in milliseconds, scaled by the speed)
         self.timer = 0
+        # How many times faster than normal the animations are played
+        self.speed = 1
+        # Whether the frame rate is left uncapped
+        self.uncapped = False
         # The game step (0, 1 or 2)
         self.step = 0
-        # Used to display errors
-        self.network_error = ''
         # The function to call at each step of the game. (cf self.step)
         self.steps = [
             self.wait_step,
@@ -39,8 +42,20 @@ class State():
         ]
         # The list of connections being highlighted in green.
         self.test_network_highlight = []
-        # The itineraries the system has already evaluated.
-        self.itineraries_to_test = []
+        # Whether the performance overlay is shown
+        self.show_performance = False
+        # Whether connections are colored by how often they're used
+        self.show_heat_map = False
+        # The part of the board shown in the window
+        self.camera = Camera()
+        # Where the board was grabbed to pan it, None if it isn't being dragged
+        self.grabbed_at = None
+        # From this zoom on, locations are named and connections drawn at full width (cf LABELS_MAX_LOCATIONS).
+        self.detail_zoom = max(1, math.sqrt(
+            len(self.locations) / LABELS_MAX_LOCATIONS))
+        # The locations and the connections by position, to only draw what's on screen
+        self.location_index = SpatialIndex(self.locations)
+        self.connection_index = None
 
         # The font used to display regular text.
         self.font = None
@@ -48,15 +63,82 @@ class State():
         self.big_font = None
         # The pygame window
         self.window = None
+        # Evaluates the network in the background (cf game/worker.py)
+        self.worker = None
+        # Whether the student's algorithm is evaluated again whenever its file changes (cf watch_router)
+        self.watch = watch
+        # When the file of the student's algorithm was last modified, and when that was last checked
+        self.router_mtime = os.path.getmtime(self.sandbox.router_path) if watch else None
+        self.router_checked_at = 0
 
         self.init_window()
-        self.load_config()
-        self.init_itineraries()
+        self.init_layers()
+        # The network, its number of connections and their total load when the loads were last copied
+        # for a snapshot, and the usage copied then (cf take_snapshot)
+        self.usage_key = None
+        self.usage = None
+        # What the window shows of the evaluation
+        self.snapshot = self.take_snapshot()
+        self.start_evaluation()
+
+    def start_evaluation(self):
+        """
+        Run the student's algorithm and the steps of the game in the background.
+        """
+        self.worker = EvaluationWorker(self)
+        self.worker.start()
 
-        # The graph representing our railway network
-        self.graph = LocationGraph(self.locations)
+    def stop(self):
+        """
+        Stop evaluating, once the window is closed or to start over. A sandboxed router still running
+        is killed, so that the worker doesn't wait for it.
+        """
+        if self.sandbox != None:
+            self.sandbox.kill()
+        if self.worker != None:
+            self.worker.stop()
+
+    def watch_router(self):
+        # Evaluate the student's algorithm again once its file changed, checking every WATCH_INTERVAL_MS.
+        now = time.perf_counter()
+        if now - self.router_checked_at < WATCH_INTERVAL_MS / 1000:
+            return
+        self.router_checked_at = now
+        try:
+            mtime = os.path.getmtime(self.sandbox.router_path)
+        except OSError:
+            # The file is being saved.
+            return
+        if mtime != self.router_mtime:
+            self.router_mtime = mtime
+            self.reload_router()
 
-        self.connect_locations()
+    def reload_router(self):
+        """
+        Evaluate the latest version of the student's algorithm from scratch. The window, the assets
+        and the level are kept, only the network and its KPIs start over. The router always runs in
+        a sandbox when watching (cf __init__), which loads the file again each time it starts, and
+        a previous version still running is killed.
+        """
+        self.stop()
+        if self.sandbox.running:
+            self.sandbox.stop(None)
+        self.restart()
+        self.snapshot = self.take_snapshot()
+        if not self.router_error:
+            self.start_evaluation()
+
+    def restart(self):
+        super().restart()
+        self.graph.track_paths(DYNAMIC_PATHS_MAX_LOCATIONS)
+        self.test_network_highlight.clear()
+        self.timer = 0
+        # No need to wait before animating the new network.
+        self.step = 1
+        # Every layer showing the network starts over.
+        self.drawn_network_error = None
+        self.drawn_usage = None
+        self.dirty_rects.append(self.window.get_rect())
 
     def init_window(self):
         """
@@ -69,81 +151,154 @@ class State():
         self.window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         self.window.fill(pygame.color.Color(255, 255, 255))
 
-    def init_itineraries(self):
+    def update(self, elapsed_ms: float):
         """
-        Initializes a list of all the intineraries we're going to test (aka all of them)
+        Called each frame with the time elapsed since the previous frame, updates the game state.
         """
-        for loc1 in self.locations:
-            for loc2 in self.locations:
-                if loc1 != loc2 and Connection(loc1, loc2) not in self.itineraries_to_test:
-                    self.itineraries_to_test.append(Connection(loc1, loc2))
+        started_at = time.perf_counter()
+        with self.profiler.span('events'):
+            self.handle_events()
+            if self.watch:
+                self.watch_router()
+        with self.profiler.span('steps'):
+            self.animate(elapsed_ms)
+        self.draw()
+        # Update the parts of the window that changed
+        with self.profiler.span('display update'):
+            pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
+        self.profiler.end_frame(started_at, elapsed_ms)
 
-    def load_config(self):
+    def handle_events(self):
+        """
+        Handle pygame events. Closes the program when the window is closed.
+        Keys 1, 2 and 3 change the speed of the animations, S skips to the results,
+        U toggles the frame rate cap, H the heat map and F3 the performance overlay.
+        The mouse wheel, + and - zoom, dragging the board pans it and 0 shows the whole board again.
         """
-        Load the locations from the config file into an array to manipulate them easier.
+        for event in pygame.event.get():
+            self.handle_event(event)
+
+    def handle_event(self, event: pygame.event.Event):
+        if event.type == pygame.QUIT:
+            self.active = False
+        if event.type == pygame.KEYDOWN:
+            if event.key in SPEED_KEYS:
+                self.set_speed(SPEED_KEYS[event.key])
+            if event.key == pygame.K_s:
+                self.skip_to_results()
+            if event.key == pygame.K_u:
+                self.uncapped = not self.uncapped
+            if event.key == pygame.K_h:
+                self.show_heat_map = not self.show_heat_map
+                # The heat map isn't kept up to date while hidden.
+                self.drawn_usage = None
+                self.dirty_rects.append(self.window.get_rect())
+            if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                self.camera.zoom_at(ZOOM_STEP, self.camera.viewport.center)
+            if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.camera.zoom_at(1 / ZOOM_STEP, self.camera.viewport.center)
+            if event.key in (pygame.K_0, pygame.K_KP0):
+                self.camera.reset()
+            if event.key == pygame.K_F3:
+                self.show_performance = not self.show_performance
+                self.dirty_rects.append(self.performance_rect)
+        if event.type == pygame.MOUSEWHEEL:
+            self.camera.zoom_at(ZOOM_STEP ** event.y, pygame.mouse.get_pos())
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.camera.viewport.collidepoint(event.pos):
+            self.grabbed_at = event.pos
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.grabbed_at = None
+        if event.type == pygame.MOUSEMOTION and self.grabbed_at != None:
+            self.camera.pan(event.pos[0] - self.grabbed_at[0],
+                            event.pos[1] - self.grabbed_at[1])
+            self.grabbed_at = event.pos
+
+    def set_speed(self, speed: int):
+        """
+        Play the animations `speed` times faster.
         """
-        self.locations = []
-        for loc in self.config['locations']:
-            self.locations.append(
-                Location(loc['x'], loc['y'] + HEADER_HEIGHT, loc['name'], loc['color']))
+        self.speed = speed
+        caption = 'Railway Planner - ' + self.config['name']
+        if speed != 1:
+            caption += f' (x{speed})'
+        pygame.display.set_caption(caption)
 
-    def connect_locations(self):
+    def animate(self, elapsed_ms: float):
         """
-        Invoke the student's algorithm. Store all the connections it created in a buffer.
+        Show the latest snapshot of the evaluation, the worker takes care of the steps of the game.
         """
-        connect_locations(self.locations, self.connect_handler)
+        snapshot = self.worker.latest()
+        if snapshot != None:
+            self.snapshot = snapshot
 
-    def connect_handler(self, a, b):
+    def take_snapshot(self):
         """
-        This function is called by the student's algorithm.
+        What the window shows of the evaluation at this point (cf Snapshot).
         """
-        # We don't want want to connect a location to itself
-        if a == b:
-            return
-        # We don't want to connect stuff twice
-        for con in self.connections_buffer:
-            if con[0] == a and con[1] == b:
-                return
-            if con[1] == a and con[0] == b:
-                return
-        # We append each student-made connection to a buffer to display connections
-        # one by one afterwards.
-        self.connections_buffer.append((a, b))
+        error = self.router_error or self.network_error
+        if not error and self.building() and len(self.graph.connections) and not self.graph.dynamic.connected():
+            error = "Some locations aren't connected"
+        progress = None
+        if self.itineraries_to_test != None:
+            progress = (self.itineraries_to_test.done,
+                        self.itineraries_to_test.total)
+        # Loads only ever increase, so they only changed if the total did.
+        usage_key = (self.graph, len(self.graph.connections),
+                     self.graph.loads.total)
+        if usage_key != self.usage_key:
+            self.usage_key = usage_key
+            self.usage = (self.graph.loads.total, self.graph.loads.maximum,
+                          array('q', [con.times_used for con in self.graph.connections]))
+        return Snapshot(self.graph, len(self.graph.connections), tuple(self.kpis()), error,
+                        tuple(self.test_network_highlight), self.usage, progress)
+
+    def update_animations(self, elapsed_ms: float):
+        """
+        Depending on the current step of the game, call the right function.
+        """
+        self.timer += elapsed_ms * self.speed
+        if self.step < len(self.steps):
+            self.steps[self.step]()
 
-    def update(self):
+    def building(self):
         """
-        Called each frame, updates the game state.
+        Are connections being added or tested, the header then shows what the network connects so far.
         """
-        self.handle_events()
-        self.update_animations()
-        self.draw()
-        # Update the window
-        pygame.display.update()
+        return self.step < len(self.steps) and self.steps[self.step] in (self.load_connections_step, self.test_network_step)
 
-    def handle_events(self):
+    def average_travel_time(self):
         """
-        Handle pygame events. Closes the program when the window is closed
+        While connections are added, the average travel time is the one of the network so far.
         """
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.active = False
+        paths = self.graph.dynamic
+        if self.step < len(self.steps) and self.steps[self.step] == self.load_connections_step and \
+                paths != None and paths.distances != None and paths.num_pairs:
+            return (paths.total_hops * CHANGE_TRAIN_TIME +
+                    paths.total_distance * RAILWAY_UNIT_TRAVEL_TIME) / paths.num_pairs
+        return super().average_travel_time()
+
+    def skip_to_results(self):
+        """
+        Stop animating and evaluate everything that's left at once, in the background.
+        """
+        self.worker.skip()
 
-    def update_animations(self):
+    def finish(self, stopping=None):
         """
-        Depending on the current step of the game, call the right function.
+        Evaluate everything that's left at once, until `stopping` is set (cf Evaluation.run).
         """
-        if self.step < len(self.steps):
-            self.steps[self.step]()
+        self.run(stopping)
+        self.test_network_highlight.clear()
+        self.timer = 0
+        self.step = len(self.steps)
 
     def wait_step(self):
         """
         Ensures the game waits a bit after being launched before animating connections.
         """
-        # Wait a 100 frames and do nothing
-        # Increment the timer each step
-        self.timer += 1
-        if self.timer > 100:
-            # When we reach 100, go to the next step
+        if self.timer >= STARTUP_DELAY_MS:
+            # Once we waited long enough, go to the next step
             self.timer = 0
             self.step += 1
 
@@ -151,30 +306,23 @@ class State():
         """
         Slowly animate each connection.
         """
-        self.timer += 1
-        if len(self.connections_buffer):
-            # Every 20 frames, add a connection to the screen
-            if self.timer % 20 == 0:
-                self.graph.add_connection(
-                    self.connections_buffer[0][0], self.connections_buffer[0][1])
-                self.connections_buffer.pop(0)
-                #### COST ###############################################
-                self.cost += self.graph.connections[-1].distance() * \
-                    RAILWAY_UNIT_COST
-                self.cost += CONNECTION_COST
-                #########################################################
-        else:
+        # A sandboxed algorithm keeps sending connections while it's running.
+        self.receive_connections()
+        # Every ADD_CONNECTION_DELAY_MS, add a connection to the screen
+        while len(self.connections_buffer) and self.timer >= ADD_CONNECTION_DELAY_MS:
+            self.timer -= ADD_CONNECTION_DELAY_MS
+            self.add_next_connection()
+        if not len(self.connections_buffer) and not self.routing():
             # Once we've animated everything, we go to the next step.
             self.timer = 0
             self.step += 1
 
     def test_network_step(self):
         """
-        Every 25 frames, test a new itinerary and evaluate it.
+        Every SHOW_CONNECTION_DELAY_MS, test a new itinerary and evaluate it.
         """
-        self.timer += 1
-        # Every 25 frames.
-        if self.timer % SHOW_CONNECTION_DELAY == 0:
+        while self.step < len(self.steps) and self.timer >= SHOW_CONNECTION_DELAY_MS:
+            self.timer -= SHOW_CONNECTION_DELAY_MS
             # We un-highlight every green-highlighted connection.
             self.test_network_highlight.clear()
 
@@ -184,111 +332,471 @@ class State():
                 return
 
             # We test an itinerary and remove it from the list of itineraries to test.
-            itinerary = self.itineraries_to_test[-1]
-            self.test_one_itinerary(itinerary)
-            self.itineraries_to_test.pop()
-
-    def test_one_itinerary(self, itinerary):
-        """
-        Test the commute from point A to point B.
-        """
-        # We get the shortest path from point A to point B.
-        directions = self.graph.pathfind(itinerary.a, itinerary.b)
-
-        # Maybe there's no path from A to B.
-        if directions == None:
-            self.network_error = "Some locations aren't connected"
-            return
+            directions = self.test_next_itinerary()
 
-        ###### Traffic Congestion #############################
-        # For each connection we check how often it's been used and
-        # We calculate the variance of this data.
-        loads = []
-        for con in self.graph.connections:
-            loads.append(con.times_used)
-        if len(loads) > 1:
-            self.traffic_congestion = statistics.variance(
-                loads)
-        else:
-            self.traffic_congestion = 0
-        #######################################################
-
-        ###### Average Travel Time ############################
-        # Each stop takes CHANGE_TRAIN_TIME mins.
-        # Travelling a pixel on screen costs RAILWAY_UNIT_TRAVEL_TIME.
-        self.num_travels += 1
-        self.total_travel_time_mins += len(
-            directions) * CHANGE_TRAIN_TIME
-        for i in range(len(directions)):
-            self.total_travel_time_mins += directions[i].distance() * \
-                RAILWAY_UNIT_TRAVEL_TIME
-        #######################################################
-
-        # We highligh the connections we crossed during this commute in green.
-        for i in range(len(directions)):
-            self.test_network_highlight.append(directions[i])
+            # We highligh the connections we crossed during this commute in green.
+            if directions != None:
+                self.test_network_highlight.extend(directions)
 
 
 ####################################################
 #### DRAW FUNCTION #################################
 ####################################################
 
-    def draw(self):
-        # Draw everything on screen every frame.
-
-        # Draw a white background
-        self.window.fill((255, 255, 255))
-        tmp = self.assets.background_image.convert()
-        tmp.set_alpha(128)
-        self.window.blit(tmp, (0, HEADER_HEIGHT))
-        # Draw the game header
-        self.draw_header()
-        # Draw each connection
-        self.draw_connections()
-        # Draw each connection
-        self.draw_locations()
-
-    def draw_header(self):
-        # Pygame code to display the whole header
-        warning_text_sf = self.font.render(self.network_error, True, RED)
-        text_rect = warning_text_sf.get_rect(
-            center=(self.window.get_rect().center[0], HEADER_HEIGHT + 10))
-        self.window.blit(warning_text_sf, text_rect)
-        self.window.blit(self.assets.uom_logo, (0, 0))
-        self.draw_header_value('Average Travel Time',
-                               str(math.floor(self.total_travel_time_mins / self.num_travels)) + 'min' if self.num_travels else '0min', 500, GREY)
-        self.draw_header_value('Cost', str(
-            math.floor(self.cost)) + 'mi$', 670, GREY)
-        self.draw_header_value('Traffic congestion',
-                               f'{self.traffic_congestion:.2f}', 820, GREY)
-        pygame.draw.line(self.window, UOM_MAIN_COLOR, (0, HEADER_HEIGHT -
+    def init_layers(self):
+        """
+        Compose everything that never changes once, so each frame only redraws what changed.
+        """
+        # Layer with the faded background, the header and the KPI titles.
+        self.background_layer = pygame.Surface(
+            (WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
+        self.background_layer.fill((255, 255, 255))
+        self.background_layer.blit(self.assets.uom_logo, (0, 0))
+        for (title, _), x_offset in zip(self.kpis(), KPI_OFFSETS):
+            text_surface = self.font.render(title, True, GREY)
+            text_rect = text_surface.get_rect(
+                center=(x_offset, HEADER_HEIGHT / 2 - 10))
+            self.background_layer.blit(text_surface, text_rect)
+        pygame.draw.line(self.background_layer, UOM_MAIN_COLOR, (0, HEADER_HEIGHT -
                          HEADER_LINE_WIDTH), (WINDOW_WIDTH, HEADER_HEIGHT - HEADER_LINE_WIDTH), HEADER_LINE_WIDTH)
 
-    def draw_header_value(self, title: str, value: str, x_offset: int, color: tuple):
-        # Pygame code to display one KPI
-        text_surface = self.font.render(title, True, color)
-        text_rect = text_surface.get_rect(
-            center=(x_offset, HEADER_HEIGHT / 2 - 10))
-        self.window.blit(text_surface, text_rect)
+        # Layer with the background, the network error and every connection drawn so far.
+        self.network_layer = None
+        self.drawn_network_error = None
+        self.num_drawn_connections = 0
+
+        # Layer with the locations, drawn on top of everything.
+        self.locations_layer = pygame.Surface(
+            (WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        # The camera view when the board was last drawn (cf draw_board).
+        self.drawn_view = None
+
+        # Layer with the connections colored by how often they're used, on top of the network layer.
+        self.heat_layer = pygame.Surface(
+            (WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        # The index in HEAT_COLORS (plus one, 0 if unused) of each connection on the heat layer.
+        self.heat_buckets = []
+        # The network and its usage when the heat layer was last drawn.
+        self.drawn_usage = None
+
+        # The KPI values on screen: a list of (value, surface, rect).
+        self.drawn_kpis = [None] * len(KPI_OFFSETS)
+        # The connections highlighted on screen.
+        self.drawn_highlight = ()
+        # The performance overlay, in the bottom left corner.
+        self.performance_overlay = pygame.Surface(
+            PERFORMANCE_OVERLAY_SIZE, pygame.SRCALPHA)
+        self.performance_rect = self.performance_overlay.get_rect(
+            bottomleft=(10, WINDOW_HEIGHT - 10))
+        self.performance_refreshed_at = 0
+
+        # The parts of the window that need to be redrawn (the whole window at first).
+        self.dirty_rects = [self.window.get_rect()]
 
+    def draw(self):
+        # Find out what changed since the last frame and redraw only these parts of the screen.
+        if self.camera.view() != self.drawn_view:
+            with self.profiler.span('draw board'):
+                self.draw_board()
+        with self.profiler.span('draw header'):
+            self.draw_header()
+        with self.profiler.span('draw connections'):
+            self.draw_connections()
+        if self.show_heat_map:
+            with self.profiler.span('draw heat map'):
+                self.draw_heat_map()
+        if self.show_performance:
+            self.dirty_rects.append(self.performance_rect)
+        with self.profiler.span('compose'):
+            for rect in self.dirty_rects:
+                self.compose(rect)
+        if self.show_performance:
+            with self.profiler.span('draw performance'):
+                self.draw_performance()
+
+    def compose(self, rect: pygame.Rect):
+        # Redraw every layer inside `rect`, from the bottom to the top.
+        self.window.set_clip(rect)
+        self.window.blit(self.network_layer, rect, rect)
+        if self.show_heat_map:
+            self.window.blit(self.heat_layer, rect, rect)
+        for _, text_surface, text_rect in self.drawn_kpis:
+            if text_rect.colliderect(rect):
+                self.window.blit(text_surface, text_rect)
+        self.window.set_clip(rect.clip(self.camera.viewport))
+        for con in self.drawn_highlight:
+            pygame.draw.line(self.window, GREEN, *
+                             self.screen_line(con), self.line_width(6))
+        self.window.set_clip(rect)
+        self.window.blit(self.locations_layer, rect, rect)
+        self.window.set_clip(None)
+
+    def draw_header(self):
+        # Only the KPI values and the network error can change in the header.
+        error = self.snapshot.error
+        if error != self.drawn_network_error:
+            # The error is drawn below the connections, so the network layer starts over.
+            center = (self.window.get_rect().center[0], HEADER_HEIGHT + 10)
+            if self.drawn_network_error:
+                # The previous error goes away, it can be longer than the new one.
+                previous_rect = pygame.Rect(
+                    (0, 0), self.font.size(self.drawn_network_error))
+                previous_rect.center = center
+                self.dirty_rects.append(previous_rect)
+            self.drawn_network_error = error
+            self.network_layer = self.background_layer.copy()
+            warning_text_sf = self.font.render(error, True, RED)
+            text_rect = warning_text_sf.get_rect(center=center)
+            self.network_layer.blit(warning_text_sf, text_rect)
+            self.num_drawn_connections = 0
+            self.dirty_rects.append(text_rect)
+        for i, ((_, value), x_offset) in enumerate(zip(self.snapshot.kpis, KPI_OFFSETS)):
+            if self.drawn_kpis[i] == None or self.drawn_kpis[i][0] != value:
+                self.draw_header_value(i, value, x_offset, GREY)
+
+    def draw_header_value(self, i: int, value: str, x_offset: int, color: tuple):
+        # Pygame code to display one KPI value, its title is part of the background.
         text_surface = self.big_font.render(value, True, color)
         text_rect = text_surface.get_rect(
             center=(x_offset, HEADER_HEIGHT / 2 + 10))
-        self.window.blit(text_surface, text_rect)
-
-    def draw_locations(self):
-        # Draw each location with a circle and the name.
-        for loc in self.locations:
+        if self.drawn_kpis[i] != None:
+            self.dirty_rects.append(self.drawn_kpis[i][2])
+        self.drawn_kpis[i] = (value, text_surface, text_rect)
+        self.dirty_rects.append(text_rect)
+
+    def draw_board(self):
+        # Draw the part of the board the camera shows, every layer showing the board starts over.
+        self.drawn_view = self.camera.view()
+        viewport = self.camera.viewport
+        image = self.assets.faded_background_image
+        self.background_layer.fill((255, 255, 255), viewport)
+        if not self.camera.moved():
+            self.background_layer.blit(image, viewport)
+        else:
+            # Only the part of the background on screen is scaled, from whole pixels of the picture.
+            left, top, right, bottom = self.camera.visible_area()
+            area = pygame.Rect(math.floor(left), math.floor(top),
+                               math.ceil(right) - math.floor(left), math.ceil(bottom) - math.floor(top))
+            area = area.move(-viewport.left, -viewport.top).clip(image.get_rect())
+            zoomed = pygame.transform.smoothscale(image.subsurface(area), (
+                round(area.width * self.camera.zoom), round(area.height * self.camera.zoom)))
+            zoomed.set_alpha(image.get_alpha())
+            self.background_layer.set_clip(viewport)
+            self.background_layer.blit(zoomed, self.camera.to_screen(
+                area.left + viewport.left, area.top + viewport.top))
+            self.background_layer.set_clip(None)
+
+        # The network layer is a copy of the background (cf draw_header).
+        self.drawn_network_error = None
+        self.locations_layer.fill((0, 0, 0, 0))
+        self.draw_locations(self.locations_layer)
+        self.drawn_usage = None
+        self.dirty_rects.append(self.window.get_rect())
+
+    def detailed(self):
+        return self.camera.zoom >= self.detail_zoom
+
+    def draw_locations(self, surface: pygame.Surface):
+        # Draw each location on screen with a circle and, if zoomed in enough, the name.
+        surface.set_clip(self.camera.viewport)
+        detailed = self.detailed()
+        for loc in self.location_index.inside(*self.camera.visible_area(LABEL_MARGIN)):
+            x, y = self.camera.to_screen(loc.x, loc.y)
+            if not detailed:
+                pygame.draw.circle(surface, COLORS[loc.color], (x, y), 3)
+                continue
             pygame.draw.circle(
-                self.window, COLORS[loc.color], (loc.x, loc.y), 10)
+                surface, COLORS[loc.color], (x, y), 10)
             text_surface = self.font.render(
                 loc.name, True, (0, 0, 0), EXTREME_LIGHT_GREY)
             text_rect = text_surface.get_rect(
-                center=(loc.x, loc.y + 20))
-            self.window.blit(text_surface, text_rect)
+                center=(x, y + 20))
+            surface.blit(text_surface, text_rect)
+        surface.set_clip(None)
 
     def draw_connections(self):
-        # For each connection draw a grey line.
-        for con in self.graph.connections:
-            pygame.draw.line(self.window, GREEN if con in self.test_network_highlight else GREY,
-                             (con.a.x, con.a.y), (con.b.x, con.b.y), 6 if con in self.test_network_highlight else 4)
+        # Draw a grey line for each new connection on screen.
+        new_connections = self.snapshot.graph.connections[self.num_drawn_connections:self.snapshot.num_connections]
+        self.network_layer.set_clip(self.camera.viewport)
+        if self.num_drawn_connections == 0 and len(new_connections) or len(new_connections) > MAX_DIRTY_RECTS:
+            # The network layer started over, or too much changed: draw every connection
+            # on screen at once and redraw the whole board.
+            for con in self.visible_connections():
+                pygame.draw.line(self.network_layer, GREY, *
+                                 self.screen_line(con), self.line_width(4))
+            self.dirty_rects.append(self.camera.viewport)
+        else:
+            for con in new_connections:
+                self.dirty_rects.append(pygame.draw.line(self.network_layer, GREY, *
+                                                         self.screen_line(con), self.line_width(4)))
+        self.network_layer.set_clip(None)
+        self.num_drawn_connections = self.snapshot.num_connections
+        # Connections highlighted in green are drawn on the fly.
+        if self.snapshot.highlight != self.drawn_highlight:
+            for con in self.drawn_highlight + self.snapshot.highlight:
+                self.dirty_rects.append(self.line_rect(con, 6))
+            self.drawn_highlight = self.snapshot.highlight
+
+    def draw_heat_map(self):
+        # Color each connection by how often it's been used, relative to the most used one.
+        # Only the connections whose color changed are drawn again.
+        graph = self.snapshot.graph
+        connections = graph.connections[:self.snapshot.num_connections]
+        total, maximum, loads = self.snapshot.usage
+        usage = (graph, len(connections), total)
+        if usage == self.drawn_usage:
+            return
+        if self.drawn_usage == None or self.drawn_usage[0] is not graph:
+            # A different network (cf ReplayState.seek), start over.
+            self.heat_layer.fill((0, 0, 0, 0))
+            self.heat_buckets = []
+        self.drawn_usage = usage
+
+        # The loads are those of the snapshot, the worker may have used connections since.
+        buckets = [0 if load == 0 else min(len(HEAT_COLORS), 1 + (load - 1) * len(HEAT_COLORS) // max(maximum, 1))
+                   for load in loads]
+        drawn = self.heat_buckets + [0] * \
+            (len(buckets) - len(self.heat_buckets))
+        changed = [i for i in range(len(buckets)) if buckets[i] != drawn[i]]
+        self.heat_layer.set_clip(self.camera.viewport)
+        if len(changed) > MAX_DIRTY_RECTS:
+            # Redrawing everything at once is faster than redrawing many small parts.
+            self.dirty_rects.append(self.window.get_rect())
+            for i in changed:
+                pygame.draw.line(self.heat_layer, HEAT_COLORS[buckets[i] - 1], *
+                                 self.screen_line(connections[i]), self.line_width(4))
+        else:
+            for i in changed:
+                self.dirty_rects.append(pygame.draw.line(self.heat_layer, HEAT_COLORS[buckets[i] - 1], *
+                                                         self.screen_line(connections[i]), self.line_width(4)))
+        self.heat_layer.set_clip(None)
+        self.heat_buckets = buckets
+
+    def draw_performance(self):
+        # Show the FPS and how long each phase of a frame takes, refreshed a few times per second.
+        now = time.perf_counter()
+        if now - self.performance_refreshed_at > PERFORMANCE_REFRESH_MS / 1000:
+            self.performance_refreshed_at = now
+            lines = [f'{self.profiler.fps():.0f} FPS, frame {self.profiler.frame_time:.2f}ms']
+            if self.snapshot.progress != None:
+                lines.append(
+                    'itineraries: {}/{}'.format(*self.snapshot.progress))
+            for name, duration in sorted(self.profiler.timings.items()):
+                if name != 'frame':
+                    lines.append(f'{name}: {duration:.2f}ms')
+            self.performance_overlay.fill((255, 255, 255, 200))
+            for i, line in enumerate(lines):
+                self.performance_overlay.blit(
+                    self.font.render(line, True, BLACK), (6, 4 + i * 16))
+        self.window.blit(self.performance_overlay, self.performance_rect)
+
+    def visible_connections(self):
+        # The connections on screen, in the order they were added.
+        connections = self.snapshot.graph.connections
+        if self.connection_index == None or self.connection_index.connections is not connections:
+            self.connection_index = ConnectionIndex(
+                connections, self.location_index.cell_size)
+        return self.connection_index.inside(*self.camera.visible_area(self.line_width(6)))
+
+    def screen_line(self, con):
+        # Where both ends of a connection are in the window.
+        return self.camera.to_screen(con.a.x, con.a.y), self.camera.to_screen(con.b.x, con.b.y)
+
+    def line_width(self, width: int):
+        # Far out, lines are thinner.
+        if self.detailed():
+            return width
+        return max(1, width // 3)
+
+    def line_rect(self, con, width: int):
+        # The part of the screen covered by a connection drawn `width` pixels wide.
+        (a_x, a_y), (b_x, b_y) = self.screen_line(con)
+        left, right = sorted((a_x, b_x))
+        top, bottom = sorted((a_y, b_y))
+        return pygame.Rect(left, top, right - left, bottom - top).inflate(width * 2, width * 2)
+
+
+class ReplayState(State):
+    """
+    Plays back a recorded evaluation (cf game/replay.py). The student's algorithm isn't run and
+    nothing is pathfound, each event of the replay is simply drawn.
+    Space pauses, the arrows step through the events, Home and End go to the start and the end,
+    and the timeline at the bottom of the window can be clicked or dragged to seek anywhere.
+    """
+
+    def __init__(self, replay, profiler=None):
+        super().__init__(replay.config, profiler=profiler)
+        # The recorded events
+        self.replay = replay
+        # How many events have been played so far
+        self.position = 0
+        # Whether the replay is paused
+        self.paused = False
+        # Whether the timeline is being dragged
+        self.scrubbing = False
+        # The replay only waits a bit before playing the events.
+        self.steps = [
+            self.wait_step,
+            self.replay_step,
+        ]
+        # The timeline, at the bottom of the window.
+        self.timeline_rect = pygame.Rect(
+            0, WINDOW_HEIGHT - TIMELINE_HEIGHT, WINDOW_WIDTH, TIMELINE_HEIGHT)
+        self.drawn_position = None
+        # The (a index, b index) of each connection, in the order they're added
+        self.replay_connections = [(event[1], event[2])
+                                   for event in replay.events if event[0] == CONNECTION]
+        # How many events are played between two checkpoints. Each checkpoint keeps the load of every
+        # connection, so that checkpoints never take more memory than the events.
+        self.checkpoint_interval = max(
+            REPLAY_CHECKPOINT_EVENTS, len(self.replay_connections))
+        # What the events change after every checkpoint_interval events (cf take_checkpoint), played so far
+        self.checkpoints = [self.take_checkpoint()]
+
+    def init_itineraries(self):
+        # The tested itineraries are in the replay.
+        pass
+
+    def start_evaluation(self):
+        # Everything but the baseline is in the replay, events are cheap enough to be played as the window is drawn.
+        self.score_baseline()
+
+    def animate(self, elapsed_ms: float):
+        self.update_animations(elapsed_ms)
+        self.snapshot = self.take_snapshot()
+
+    def handle_event(self, event: pygame.event.Event):
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.timeline_rect.collidepoint(event.pos):
+            # Dragging the timeline doesn't pan the board.
+            self.scrubbing = True
+        else:
+            super().handle_event(event)
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE:
+                self.paused = not self.paused
+            if event.key == pygame.K_LEFT:
+                self.paused = True
+                self.seek(self.position - 1)
+            if event.key == pygame.K_RIGHT:
+                self.paused = True
+                self.seek(self.position + 1)
+            if event.key == pygame.K_HOME:
+                self.seek(0)
+            if event.key == pygame.K_END:
+                self.seek(len(self.replay.events))
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.scrubbing = False
+        if self.scrubbing and event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION):
+            self.seek(round(event.pos[0] / WINDOW_WIDTH *
+                      len(self.replay.events)))
+
+    def skip_to_results(self):
+        self.seek(len(self.replay.events))
+
+    def replay_step(self):
+        """
+        Play each event after the same delay as when it was recorded.
+        """
+        events = self.replay.events
+        if self.paused:
+            self.timer = 0
+        while self.position < len(events) and self.timer >= self.delay(events[self.position]):
+            self.timer -= self.delay(events[self.position])
+            self.play_next()
+        if self.position == len(events) and self.timer >= SHOW_CONNECTION_DELAY_MS:
+            # Like at the end of the evaluation, un-highlight the last itinerary.
+            self.test_network_highlight.clear()
+
+    def delay(self, event: tuple):
+        if event[0] == CONNECTION:
+            return ADD_CONNECTION_DELAY_MS
+        if event[0] == PATH:
+            return SHOW_CONNECTION_DELAY_MS
+        return 0
+
+    def seek(self, position: int):
+        """
+        Jump to the moment `position` events have been played, from the closest checkpoint before it
+        if that's closer than where the replay is.
+        """
+        position = max(0, min(position, len(self.replay.events)))
+        checkpoint = min(position // self.checkpoint_interval,
+                         len(self.checkpoints) - 1)
+        if position < self.position or checkpoint * self.checkpoint_interval > self.position:
+            self.restore_checkpoint(checkpoint)
+        while self.position < position:
+            self.play_next()
+        self.timer = 0
+        self.step = len(self.steps) - 1
+
+    def play_next(self):
+        self.play(self.replay.events[self.position])
+        self.position += 1
+        if self.position == len(self.checkpoints) * self.checkpoint_interval:
+            self.checkpoints.append(self.take_checkpoint())
+
+    def play(self, event: tuple):
+        # Apply one event of the replay (cf Replay).
+        if event[0] == ERRORS:
+            _, self.router_error, self.network_error = event
+            return
+        self.test_network_highlight.clear()
+        if event[0] == CONNECTION:
+            _, a_idx, b_idx, kpis = event
+            self.graph.add_connection(
+                self.locations[a_idx], self.locations[b_idx])
+        else:
+            _, _, _, path, kpis = event
+            self.test_network_highlight.extend(
+                self.graph.connections[i] for i in path)
+            self.graph.use([(con, 1) for con in self.test_network_highlight])
+        self.set_kpis(kpis)
+
+    def take_checkpoint(self):
+        # The number of connections, their loads, the errors and the KPIs after the events played so far.
+        return (len(self.graph.connections), array('q', [con.times_used for con in self.graph.connections]),
+                self.router_error, self.network_error,
+                (self.cost, self.traffic_congestion, self.num_travels, self.total_travel_time_mins, self.num_disconnected))
+
+    def restore_checkpoint(self, checkpoint: int):
+        # Go back (or forward) to the moment the checkpoint was taken, with a new network.
+        num_connections, loads, self.router_error, self.network_error, kpis = self.checkpoints[
+            checkpoint]
+        self.graph = LocationGraph(self.locations)
+        for a_idx, b_idx in self.replay_connections[:num_connections]:
+            self.graph.add_connection(
+                self.locations[a_idx], self.locations[b_idx])
+        self.graph.use(zip(self.graph.connections, loads))
+        self.set_kpis(kpis)
+        self.position = checkpoint * self.checkpoint_interval
+        # The last itinerary played is highlighted, unless a connection was added since.
+        self.test_network_highlight.clear()
+        i = self.position - 1
+        while i >= 0 and self.replay.events[i][0] == ERRORS:
+            i -= 1
+        if i >= 0 and self.replay.events[i][0] == PATH:
+            self.test_network_highlight.extend(
+                self.graph.connections[j] for j in self.replay.events[i][3])
+        # Every connection has to be drawn again.
+        self.drawn_network_error = None
+        self.dirty_rects.append(self.window.get_rect())
+
+    def set_kpis(self, kpis: tuple):
+        (self.cost, self.traffic_congestion, self.num_travels,
+         self.total_travel_time_mins, self.num_disconnected) = kpis
+
+    def draw(self):
+        if self.position != self.drawn_position:
+            self.drawn_position = self.position
+            self.dirty_rects.append(self.timeline_rect)
+        super().draw()
+        # The timeline is drawn on top of everything else.
+        if self.timeline_rect.collidelist(self.dirty_rects) != -1:
+            self.draw_timeline()
+
+    def draw_timeline(self):
+        pygame.draw.rect(self.window, EXTREME_LIGHT_GREY, self.timeline_rect)
+        progress = self.timeline_rect.copy()
+        progress.width = round(
+            WINDOW_WIDTH * self.position / max(1, len(self.replay.events)))
+        pygame.draw.rect(self.window, UOM_MAIN_COLOR, progress)
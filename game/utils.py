@@ -1,9 +1,24 @@
-from queue import PriorityQueue
 from collections import deque
-import statistics
+import heapq
+import math
+
+INFINITY = float('inf')
+# Connections whose bounding box overlaps more cells than this aren't bucketed (cf ConnectionIndex).
+CONNECTION_INDEX_MAX_CELLS = 64
+# Paths whose lengths differ by less than this fraction are considered as short as each other (cf LocationGraph.paths_from).
+PATH_TIE_TOLERANCE = 1e-9
+
+
+def distance_between(a, b):
+    """
+    Computes the euclidian distance between two locations.
+    """
+    return ((((b.x - a.x)**2) + ((b.y-a.y)**2))**0.5)
 
 
 class Location():
+    __slots__ = ('x', 'y', 'name', 'color')
+
     def __init__(self, x: int, y: int, name: str, color: str):
         self.x = x
         self.y = y
@@ -15,11 +30,16 @@ class Location():
             return self.x == other.x and self.y == other.y and self.name == other.name and self.color == other.color
         return False
 
+    def __hash__(self):
+        return hash((self.x, self.y, self.name, self.color))
+
     def __str__(self):
         return self.name + " (" + str(self.x) + "," + str(self.y) + ")"
 
 
 class Connection():
+    __slots__ = ('a', 'b', 'times_used')
+
     def __init__(self, a: Location, b: Location):
         self.a = a
         self.b = b
@@ -30,99 +50,551 @@ class Connection():
             return (self.a == other.a and self.b == other.b) or (self.a == other.b and self.b == other.a)
         return False
 
+    def __hash__(self):
+        # A connection from A to B is the same as a connection from B to A.
+        return hash(frozenset((self.a, self.b)))
+
     def __str__(self):
         return str(self.a) + ' <-> ' + str(self.b) + ' (Crossed ' + str(self.times_used) + ' times)'
 
     def distance(self):
-        return ((((self.b.x - self.a.x)**2) + ((self.b.y-self.a.y)**2))**0.5)
+        return distance_between(self.a, self.b)
 
 
 class LocationGraph():
     def __init__(self, locations):
         self.locations = locations
         self.connections = []
+        # The index of each location in self.locations
+        self.location_indices = {}
+        for i in range(len(locations)):
+            self.location_indices.setdefault(locations[i], i)
+        # For each location, the (neighbour index, connection, length) of each of its connections
+        self.adjacency = [[] for _ in range(len(locations))]
+        # Running statistics about how often each connection has been used
+        self.loads = LoadStatistics()
+        # What the network connects, kept up to date as connections are added (cf track_paths)
+        self.dynamic = None
 
     def add_connection(self, a: Location, b: Location):
-        self.connections.append(Connection(a, b))
+        con = Connection(a, b)
+        a_idx = self.get_location_index(a)
+        b_idx = self.get_location_index(b)
+        length = con.distance()
+        self.connections.append(con)
+        self.loads.add(con.times_used)
+        self.adjacency[a_idx].append((b_idx, con, length))
+        self.adjacency[b_idx].append((a_idx, con, length))
+        if self.dynamic != None:
+            self.dynamic.add(a_idx, b_idx, length)
+
+    def track_paths(self, max_locations: int):
+        """
+        From now on, keep track of the connected components as connections are added, and of the
+        shortest path between every pair of locations if there are at most `max_locations` (cf DynamicPaths).
+        """
+        self.dynamic = DynamicPaths(self, max_locations)
+        for a_idx in range(len(self.adjacency)):
+            for b_idx, _, length in self.adjacency[a_idx]:
+                if a_idx < b_idx:
+                    self.dynamic.add(a_idx, b_idx, length)
 
     def pathfind(self, start: Location, end: Location):
-        start_idx = self.__get_location_index(start)
-        end_idx = self.__get_location_index(end)
-        open = [start_idx]
-        g_score = {}
-        f_score = {}
+        """
+        The connections along the shortest path from `start` to `end`, None if there is none.
+        Each of them is crossed once more (cf use).
+        """
+        directions = self.__astar(self.get_location_index(start),
+                                  self.get_location_index(end))
+        if directions != None:
+            self.use([(con, 1) for con in directions])
+        return directions
+
+    def paths_from(self, source, targets=None, use: bool = False):
+        """
+        The shortest paths from location index `source` to each location index of `targets`
+        (every other location by default), with one Dijkstra instead of one A* per target.
+        Returns the distances and hops lists, indexed by location index: the length of the shortest
+        path to each location (INFINITY if there is none) and the number of connections along it,
+        and how many of the paths to `targets` cross each connection, as a list of (connection, count).
+        The paths are exactly those of pathfind: where another path is as short, the Dijkstra could
+        break the tie differently, so the A* is run for these targets only (cf __ties).
+        With `use`, each connection's times_used is incremented as if pathfind had been called for every target.
+        """
+        distances, hops, predecessors, via, order = self.__dijkstra(source)
+        tied = self.__ties(distances, predecessors, order)
+        if targets == None:
+            targets = range(len(self.locations))
+        # Count how many targets are in the subtree of each location of the shortest path tree:
+        # that's how many times the connection leading to it is crossed.
+        below = [0] * len(self.locations)
+        crossings = []
+        for target in targets:
+            if not tied[target]:
+                below[target] += 1
+                continue
+            directions = self.__astar(source, target)
+            # The length is summed from A to B, as test_one_itinerary does.
+            length = 0
+            for con in directions:
+                length += con.distance()
+            distances[target] = length
+            hops[target] = len(directions)
+            crossings.extend((con, 1) for con in directions)
+        for current in reversed(order):
+            if below[current] and via[current] != None:
+                crossings.append((via[current], below[current]))
+                below[predecessors[current]] += below[current]
+        if use:
+            self.use(crossings)
+        return distances, hops, crossings
+
+    def use(self, crossings):
+        """
+        Increment the times_used of each (connection, count) of `crossings` by count.
+        """
+        for con, count in crossings:
+            self.__use_connection(con, count)
+
+    def __dijkstra(self, source):
+        n = len(self.locations)
+        distances = [INFINITY] * n
+        hops = [0] * n
+        predecessors = [None] * n
+        via = [None] * n
+        order = []
+        distances[source] = 0
+        open = [(0, source)]
+        while len(open) > 0:
+            current_distance, current = heapq.heappop(open)
+            if current_distance > distances[current]:
+                continue
+            order.append(current)
+            for neighbour, con, length in self.adjacency[current]:
+                tentative_distance = current_distance + length
+                if tentative_distance < distances[neighbour]:
+                    distances[neighbour] = tentative_distance
+                    hops[neighbour] = hops[current] + 1
+                    predecessors[neighbour] = current
+                    via[neighbour] = con
+                    heapq.heappush(open, (tentative_distance, neighbour))
+        return distances, hops, predecessors, via, order
+
+    def __astar(self, start_idx, end_idx):
+        g_score = {start_idx: 0}  # Distance to itself is zero
         came_from = {}
-        for i in range(len(self.locations)):
-            g_score[i] = 2147800000  # Infinity
-            f_score[i] = 2147800000  # Infinity
-        g_score[start_idx] = 0  # Distance to itself is zero
-        f_score[start_idx] = self.__distance(start_idx, end_idx)
+        # Entries are (f score, position, location index, g score), the position being when the location
+        # last entered the open set. Between equal f scores, the location that has been waiting the longest
+        # is explored first, and one whose g score improves keeps its place, as the game always did.
+        # Entries whose g score is outdated are skipped when popped instead of being removed.
+        positions = {start_idx: 0}
+        entered = 0
+        open = [(self.__distance(start_idx, end_idx), 0, start_idx, 0)]
 
         while len(open) > 0:
-            current_idx = self.__get_lowest_score_node(open, f_score)
+            _, _, current_idx, current_g = heapq.heappop(open)
+            if current_g > g_score[current_idx]:
+                continue
             if current_idx == end_idx:
                 return self.__reconstruct_path(came_from, current_idx)
-            open = [j for _, j in enumerate(open) if j != current_idx]
-            neighbours = self.__get_loc_neighbours(self.locations[current_idx])
-            for n in neighbours:
-                tentative_g_score = g_score[current_idx] + \
-                    self.__distance(current_idx, n)
-                if tentative_g_score < g_score[n]:
-                    came_from[n] = current_idx
+            del positions[current_idx]
+            for n, con, length in self.adjacency[current_idx]:
+                tentative_g_score = current_g + length
+                if tentative_g_score < g_score.get(n, INFINITY):
+                    came_from[n] = (current_idx, con)
                     g_score[n] = tentative_g_score
-                    f_score[n] = tentative_g_score + \
-                        self.__distance(n, end_idx)
-                    if n not in open:
-                        open.append(n)
+                    if n not in positions:
+                        entered += 1
+                        positions[n] = entered
+                    heapq.heappush(open, (tentative_g_score + self.__distance(n, end_idx),
+                                          positions[n], n, tentative_g_score))
         return None
 
     def __reconstruct_path(self, came_from: dict, current):
-        nodes = deque()
-        nodes.appendleft(current)
-        while current in came_from.keys():
-            current = came_from[current]
-            nodes.appendleft(current)
+        connections = deque()
+        while current in came_from:
+            current, con = came_from[current]
+            connections.appendleft(con)
+        return list(connections)
+
+    def __ties(self, distances: list, predecessors: list, order: list):
+        # Whether another path to each location is as short as the one of the shortest path tree
+        # (up to PATH_TIE_TOLERANCE, for rounding errors): some location along the path can be reached
+        # as quickly from another of its neighbours. Otherwise the path is the only shortest one.
+        tied = [False] * len(self.locations)
+        for current in order[1:]:
+            predecessor = predecessors[current]
+            if tied[predecessor]:
+                tied[current] = True
+                continue
+            longest = distances[current] * (1 + PATH_TIE_TOLERANCE)
+            for neighbour, _, length in self.adjacency[current]:
+                if neighbour != predecessor and distances[neighbour] + length <= longest:
+                    tied[current] = True
+                    break
+        return tied
+
+    def __use_connection(self, con: Connection, times: int):
+        self.loads.update(con.times_used, con.times_used + times)
+        con.times_used += times
+
+    def __distance(self, current_idx, end_idx):
+        return distance_between(self.locations[current_idx], self.locations[end_idx])
+
+    def get_location_index(self, a: Location):
+        idx = self.location_indices.get(a)
+        if idx == None:
+            raise Exception('no such location')
+        return idx
+
+
+class LoadStatistics():
+    """
+    Running count, sum, sum of squares and maximum of the connections' loads (times_used).
+    Loads are integers so the sums are exact, and the variance is the same as
+    statistics.variance of every load, without going through every connection.
+    Loads only ever increase, so the maximum is exact too.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+        self.maximum = 0
+
+    def add(self, load: int):
+        self.count += 1
+        self.total += load
+        self.total_squares += load * load
+        self.maximum = max(self.maximum, load)
+
+    def update(self, old_load: int, new_load: int):
+        self.total += new_load - old_load
+        self.total_squares += new_load * new_load - old_load * old_load
+        self.maximum = max(self.maximum, new_load)
+
+    def variance(self):
+        if self.count < 2:
+            return 0
+        return (self.count * self.total_squares - self.total * self.total) / (self.count * (self.count - 1))
+
+
+class DynamicPaths():
+    """
+    What a network connects, updated as each connection is added instead of being searched from scratch:
+    the connected components of the locations (union-find) and, for small networks, the length and
+    number of connections of the shortest path between every pair of locations, which a new connection
+    can only shorten by being part of it.
+    """
+
+    def __init__(self, graph: LocationGraph, max_locations: int):
+        n = len(graph.locations)
+        # The union-find forest: the parent of each location, and the locations of each component by root
+        self.parents = list(range(n))
+        self.members = [[i] for i in range(n)]
+        # The number of components, a location listed twice only counting once
+        self.num_components = len(graph.location_indices)
+        # The number of (ordered) pairs of connected locations, and the total length and number of
+        # connections of the shortest paths between them
+        self.num_pairs = 0
+        self.total_distance = 0
+        self.total_hops = 0
+        # The length and number of connections of the shortest path between locations i and j at [i][j]
+        self.distances = None
+        self.hops = None
+        if n <= max_locations:
+            self.distances = [[INFINITY] * n for _ in range(n)]
+            self.hops = [[0] * n for _ in range(n)]
+            for i in range(n):
+                self.distances[i][i] = 0
+
+    def connected(self):
+        return self.num_components <= 1
+
+    def find(self, i: int):
+        # The root of the component of location i, halving the path to it on the way.
+        while self.parents[i] != i:
+            self.parents[i] = self.parents[self.parents[i]]
+            i = self.parents[i]
+        return i
+
+    def add(self, a_idx: int, b_idx: int, length: float):
+        if self.distances != None:
+            self.__relax(a_idx, b_idx, length)
+            self.__relax(b_idx, a_idx, length)
+        a_root = self.find(a_idx)
+        b_root = self.find(b_idx)
+        if a_root == b_root:
+            return
+        # The smallest component joins the biggest one.
+        if len(self.members[a_root]) < len(self.members[b_root]):
+            a_root, b_root = b_root, a_root
+        self.parents[b_root] = a_root
+        self.members[a_root].extend(self.members[b_root])
+        self.members[b_root] = []
+        self.num_components -= 1
+
+    def __relax(self, x: int, y: int, length: float):
+        # Shorten the paths from each location i of x's component to each location j of y's component
+        # by going from i to x, then through the new connection to y, then from y to j. Only the locations
+        # i which are now closer to y can be closer to anything past y.
+        if self.distances[x][y] <= length:
+            return
+        targets = self.members[self.find(y)]
+        distances_y = self.distances[y]
+        hops_y = self.hops[y]
+        for i in self.members[self.find(x)]:
+            distances_i = self.distances[i]
+            hops_i = self.hops[i]
+            distance_to_y = distances_i[x] + length
+            if distance_to_y >= distances_i[y]:
+                continue
+            hops_to_y = hops_i[x] + 1
+            for j in targets:
+                distance = distance_to_y + distances_y[j]
+                if distance < distances_i[j]:
+                    if distances_i[j] == INFINITY:
+                        self.num_pairs += 1
+                    else:
+                        self.total_distance -= distances_i[j]
+                        self.total_hops -= hops_i[j]
+                    distances_i[j] = distance
+                    hops_i[j] = hops_to_y + hops_y[j]
+                    self.total_distance += distance
+                    self.total_hops += hops_i[j]
+
+
+class Itineraries():
+    """
+    Every itinerary to test: each pair of distinct locations once, as (a index, b index) with a before b
+    in the list of locations, from the last pair to the first one.
+    Pairs are generated on the fly instead of being stored, only the position of the next pair is kept,
+    so testing can stop and resume anywhere and the number of itineraries left is always known.
+    """
+
+    def __init__(self, graph: LocationGraph):
+        # The index of each distinct location (a location listed twice is only tested once)
+        self.indices = range(len(graph.locations))
+        if len(graph.location_indices) != len(graph.locations):
+            self.indices = [i for i in self.indices
+                            if graph.location_indices[graph.locations[i]] == i]
+        m = len(self.indices)
+        # The total number of itineraries and how many have been tested
+        self.total = m * (m - 1) // 2
+        self.done = 0
+        # The position in self.indices of both locations of the next itinerary
+        self.a = m - 2
+        self.b = m - 1
+
+    def __len__(self):
+        # The number of itineraries left to test
+        return self.total - self.done
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.done == self.total:
+            raise StopIteration
+        itinerary = (self.indices[self.a], self.indices[self.b])
+        self.done += 1
+        self.b -= 1
+        if self.b == self.a:
+            self.a -= 1
+            self.b = len(self.indices) - 1
+        return itinerary
+
+    def batches(self):
+        """
+        The itineraries left, grouped by start: (a index, list of b indices) in the same order.
+        """
+        while len(self):
+            # Slicing a range gives a range, so batches don't take any memory either.
+            targets = self.indices[self.b:self.a:-1]
+            a_idx = self.indices[self.a]
+            self.done += len(targets)
+            self.a -= 1
+            self.b = len(self.indices) - 1
+            yield a_idx, targets
+
+
+class SpatialIndex():
+    """
+    Buckets the locations in a grid of square cells, so that the locations close to a point
+    can be found by only looking at the cells around it instead of every location.
+    Results are sorted by distance, then by position in the list of locations.
+    """
+
+    def __init__(self, locations, cell_size: float = None):
+        self.locations = locations
+        if cell_size == None:
+            # Aim for about two locations per cell.
+            xs = [loc.x for loc in locations] or [0]
+            ys = [loc.y for loc in locations] or [0]
+            area = max(max(xs) - min(xs), 1) * max(max(ys) - min(ys), 1)
+            cell_size = max(math.sqrt(2 * area / max(len(locations), 1)), 1)
+        self.cell_size = cell_size
+        # The indices of the locations inside each (column, row) cell
+        self.cells = {}
+        for i in range(len(locations)):
+            self.cells.setdefault(self.__cell(
+                locations[i].x, locations[i].y), []).append(i)
+        columns = [cell[0] for cell in self.cells] or [0]
+        rows = [cell[1] for cell in self.cells] or [0]
+        self.bounds = (min(columns), min(rows), max(columns), max(rows))
+
+    def nearest(self, loc: Location, k: int = 1):
+        """
+        The `k` locations closest to `loc`, `loc` excluded.
+        """
+        return [self.locations[i] for _, i in self.__search(loc, k, lambda other: other != loc)]
+
+    def within(self, loc: Location, radius: float):
+        """
+        Every location at most `radius` away from `loc`, `loc` excluded.
+        """
+        return [self.locations[i] for _, i in self.__search(loc, len(self.locations), lambda other: other != loc, radius)]
+
+    def nearest_not_connected(self, loc: Location, connected, radius: float = INFINITY):
+        """
+        The location closest to `loc` which isn't `loc` itself nor one of the `connected` locations.
+        Returns None if there is no such location at most `radius` away.
+        """
+        found = self.__search(
+            loc, 1, lambda other: other != loc and other not in connected, radius)
+        if len(found) == 0:
+            return None
+        return self.locations[found[0][1]]
+
+    def inside(self, left: float, top: float, right: float, bottom: float):
+        """
+        Every location inside the rectangle from (`left`, `top`) to (`right`, `bottom`),
+        in the order of the list of locations.
+        """
+        min_column, min_row, max_column, max_row = self.bounds
+        first_column, first_row = self.__cell(left, top)
+        last_column, last_row = self.__cell(right, bottom)
+        first_column, first_row = max(first_column, min_column), max(first_row, min_row)
+        last_column, last_row = min(last_column, max_column), min(last_row, max_row)
+        if (last_column - first_column + 1) * (last_row - first_row + 1) > len(self.cells):
+            # Most of the grid is inside, only look at the cells which aren't empty.
+            cells = [cell for cell in self.cells
+                     if first_column <= cell[0] <= last_column and first_row <= cell[1] <= last_row]
+        else:
+            cells = [(column, row) for column in range(first_column, last_column + 1)
+                     for row in range(first_row, last_row + 1)]
+        found = []
+        for cell in cells:
+            for i in self.cells.get(cell, ()):
+                loc = self.locations[i]
+                if left <= loc.x <= right and top <= loc.y <= bottom:
+                    found.append(i)
+        found.sort()
+        return [self.locations[i] for i in found]
+
+    def __search(self, loc: Location, k: int, accept, radius: float = INFINITY):
+        # Look at the cells ring by ring around the cell of `loc`. Every location outside
+        # of the first `ring` rings is at least `ring * cell_size` away from `loc`.
+        column, row = self.__cell(loc.x, loc.y)
+        min_column, min_row, max_column, max_row = self.bounds
+        last_ring = max(column - min_column, max_column - column,
+                        row - min_row, max_row - row, 0)
+        best = []
+        ring = 0
+        while ring <= last_ring:
+            for cell in self.__ring(column, row, ring):
+                for i in self.cells.get(cell, ()):
+                    other = self.locations[i]
+                    if not accept(other):
+                        continue
+                    distance = distance_between(loc, other)
+                    if distance <= radius:
+                        best.append((distance, i))
+            if len(best) >= k:
+                best.sort()
+                del best[k:]
+                if best[-1][0] < ring * self.cell_size:
+                    break
+            if ring * self.cell_size > radius:
+                break
+            ring += 1
+        best.sort()
+        return best[:k]
+
+    def __ring(self, column: int, row: int, ring: int):
+        if ring == 0:
+            return [(column, row)]
+        cells = []
+        for i in range(-ring, ring + 1):
+            cells.append((column + i, row - ring))
+            cells.append((column + i, row + ring))
+        for i in range(-ring + 1, ring):
+            cells.append((column - ring, row + i))
+            cells.append((column + ring, row + i))
+        return cells
+
+    def __cell(self, x: float, y: float):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+
+class ConnectionIndex():
+    """
+    Buckets connections in a grid of square cells, like SpatialIndex does with locations, so that
+    the connections inside a rectangle can be found without looking at every connection. Each
+    connection is in every cell its bounding box overlaps, except the longest ones which are always
+    looked at. `connections` is a list which may grow, new connections are bucketed when needed.
+    """
+
+    def __init__(self, connections: list, cell_size: float):
+        self.connections = connections
+        self.cell_size = cell_size
+        # The indices of the connections overlapping each (column, row) cell
+        self.cells = {}
+        # The indices of the connections overlapping too many cells
+        self.long = []
+        # How many connections of the list have been bucketed
+        self.num_indexed = 0
+
+    def inside(self, left: float, top: float, right: float, bottom: float):
+        """
+        Every connection whose bounding box overlaps the rectangle from (`left`, `top`) to (`right`, `bottom`),
+        in the order of the list of connections.
+        """
+        self.__index()
+        first_column, first_row = self.__cell(left, top)
+        last_column, last_row = self.__cell(right, bottom)
+        found = set(self.long)
+        if (last_column - first_column + 1) * (last_row - first_row + 1) > len(self.cells):
+            for (column, row), indices in self.cells.items():
+                if first_column <= column <= last_column and first_row <= row <= last_row:
+                    found.update(indices)
+        else:
+            for column in range(first_column, last_column + 1):
+                for row in range(first_row, last_row + 1):
+                    found.update(self.cells.get((column, row), ()))
         connections = []
-        for i in range(len(nodes) - 1):
-            connections.append(
-                self.__get_connection_between(nodes[i], nodes[i + 1]))
-            connections[-1].times_used += 1
+        for i in sorted(found):
+            con = self.connections[i]
+            if min(con.a.x, con.b.x) <= right and max(con.a.x, con.b.x) >= left and \
+                    min(con.a.y, con.b.y) <= bottom and max(con.a.y, con.b.y) >= top:
+                connections.append(con)
         return connections
 
-    def __get_connection_between(self, a_idx, b_idx):
-        con = None
-        for i in range(len(self.connections)):
-            if self.connections[i].a == self.locations[a_idx] and self.connections[i].b == self.locations[b_idx]:
-                con = self.connections[i]
-            if self.connections[i].b == self.locations[a_idx] and self.connections[i].a == self.locations[b_idx]:
-                con = self.connections[i]
-        return con
+    def __index(self):
+        # Bucket the connections added since the last time.
+        for i in range(self.num_indexed, len(self.connections)):
+            con = self.connections[i]
+            first_column, first_row = self.__cell(
+                min(con.a.x, con.b.x), min(con.a.y, con.b.y))
+            last_column, last_row = self.__cell(
+                max(con.a.x, con.b.x), max(con.a.y, con.b.y))
+            if (last_column - first_column + 1) * (last_row - first_row + 1) > CONNECTION_INDEX_MAX_CELLS:
+                self.long.append(i)
+                continue
+            for column in range(first_column, last_column + 1):
+                for row in range(first_row, last_row + 1):
+                    self.cells.setdefault((column, row), []).append(i)
+        self.num_indexed = len(self.connections)
 
-    def __distance(self, current_idx, end_idx):
-        return Connection(self.locations[current_idx], self.locations[end_idx]).distance()
-
-    def __get_location_index(self, a: Location):
-        for i in range(len(self.locations)):
-            if a == self.locations[i]:
-                return i
-        raise Exception('no such location')
-
-    def __get_lowest_score_node(self, open, scores):
-        lowest = 2147800000  # Infinity
-        key = 0
-        for i in range(len(open)):
-            if scores[open[i]] < lowest:
-                lowest = scores[open[i]]
-                key = open[i]
-        return key
-
-    def __get_loc_neighbours(self, loc: Location):
-        neighbours = []
-        for i in range(len(self.connections)):
-            if self.connections[i].a == loc:
-                neighbours.append(
-                    self.__get_location_index(self.connections[i].b))
-            if self.connections[i].b == loc:
-                neighbours.append(
-                    self.__get_location_index(self.connections[i].a))
-        return neighbours
+    def __cell(self, x: float, y: float):
+        return (int(x // self.cell_size), int(y // self.cell_size))
@@ -0,0 +1,93 @@
+from collections import namedtuple
+import queue
+import threading
+import time
+
+# How often the worker moves the evaluation forward (in milliseconds)
+WORKER_TICK_MS = 4
+# How long stopping waits for the worker to return (in seconds)
+WORKER_STOP_TIMEOUT = 1
+
+# What the window shows of an evaluation at some point (cf State.take_snapshot), never modified once taken:
+# the network and how many of its connections are placed, the KPIs as displayed, the error shown in the
+# header, the connections highlighted in green, the (total, maximum, loads) of the connections, loads
+# being a copy of the times_used of each connection placed, and the number of itineraries (tested, to test),
+# None if they aren't known.
+Snapshot = namedtuple('Snapshot', ['graph', 'num_connections', 'kpis', 'error', 'highlight', 'usage',
+                                   'progress'])
+
+
+class EvaluationWorker():
+    """
+    Runs the student's algorithm and the steps of the game (cf State) in a background thread, so that
+    however long routing and pathfinding take, the window keeps handling events and drawing at full
+    frame rate. After each change, the worker publishes a snapshot of what the window shows through
+    a queue, and the window only draws the latest one (cf latest).
+    """
+
+    def __init__(self, state):
+        # The evaluation moved forward by the worker, nothing else modifies it while the worker runs
+        self.state = state
+        # The snapshots not consumed by the window yet, oldest first
+        self.snapshots = queue.Queue()
+        # The requests of the window: only skipping to the results for now
+        self.skip_requested = threading.Event()
+        # Set to stop this worker only: a worker left behind (cf stop) keeps seeing it set, even once
+        # the evaluation was restarted for a new worker
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(
+            target=self.__run, name='evaluation', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def skip(self):
+        """
+        Evaluate everything that's left at once (cf State.finish).
+        """
+        self.skip_requested.set()
+
+    def latest(self):
+        """
+        The most recent snapshot published since the last call, None if there's none.
+        """
+        snapshot = None
+        while True:
+            try:
+                snapshot = self.snapshots.get_nowait()
+            except queue.Empty:
+                return snapshot
+
+    def stop(self):
+        """
+        Stop the evaluation where it is and wait for the worker to return. The student's algorithm can't
+        be interrupted when it runs in the game's process: if it doesn't return within WORKER_STOP_TIMEOUT,
+        the worker is left behind, which doesn't keep the game from closing as it's a daemon thread.
+        Returns whether the worker returned.
+        """
+        self.stopping.set()
+        self.thread.join(WORKER_STOP_TIMEOUT)
+        return not self.thread.is_alive()
+
+    def __run(self):
+        state = self.state
+        state.connect_locations()
+        # A sandboxed router keeps running meanwhile.
+        state.score_baseline()
+        published = None
+        ticked_at = time.perf_counter()
+        while not self.stopping.is_set():
+            if self.skip_requested.is_set():
+                self.skip_requested.clear()
+                state.finish(self.stopping)
+            now = time.perf_counter()
+            state.update_animations((now - ticked_at) * 1000)
+            ticked_at = now
+            snapshot = state.take_snapshot()
+            if snapshot != published:
+                published = snapshot
+                self.snapshots.put(snapshot)
+            if state.step >= len(state.steps):
+                # Nothing left to evaluate.
+                return
+            self.stopping.wait(WORKER_TICK_MS / 1000)
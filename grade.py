@@ -0,0 +1,33 @@
+import argparse
+import glob
+import sys
+from game.grade import find_submissions, grade, write_leaderboard
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Grade every submission of a directory on a set of levels, without any window.')
+    parser.add_argument('submissions',
+                        help='a directory of routers: python files, or folders with a router.py file')
+    parser.add_argument('levels', nargs='*', default=sorted(glob.glob('levels/*.json')),
+                        help='the levels to grade the routers on (defaults to levels/*.json)')
+    parser.add_argument('--output', default='leaderboard.csv',
+                        help='where to write the leaderboard, as JSON if it ends with .json (defaults to leaderboard.csv)')
+    parser.add_argument('--jobs', type=int,
+                        help='how many processes to use (defaults to one per core)')
+    parser.add_argument('--time-limit', type=float,
+                        help='the CPU time (in seconds) each router can use on a level')
+    parser.add_argument('--memory-limit', type=int,
+                        help='the memory (in MB) each router can allocate')
+    parser.add_argument('--replays', metavar='DIR',
+                        help='record each evaluation in DIR, as <submission>-<level>.bin (play them back with run.py --replay)')
+    args = parser.parse_args()
+
+    submissions = find_submissions(args.submissions)
+    if len(submissions) == 0:
+        sys.exit('No submissions found in ' + args.submissions)
+    memory_limit = args.memory_limit * 1024 * 1024 if args.memory_limit else None
+    rows = grade(submissions, args.levels, args.jobs,
+                 args.time_limit, memory_limit, args.replays)
+    write_leaderboard(rows, args.output)
+    print(f'Graded {len(submissions)} submissions on {len(args.levels)} levels, leaderboard written to {args.output}')
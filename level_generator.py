@@ -1,46 +1,166 @@
 import sys
 import json
+import math
 import random
+import argparse
 import datetime
 
 from game.constants import BOARD_WIDTH, BOARD_HEIGHT, COLORS
 
 BOARD_EDGES_OFFSET = 20
-random.seed(datetime.datetime.now().timestamp())
-
-
-def get_random_value(max):
-    return random.randint(BOARD_EDGES_OFFSET, max - BOARD_EDGES_OFFSET)
-
-
-def get_random_color():
-    return random.choice(list(COLORS.items()))[0]
-
-
-print('Level name: ', end='')
-level_name = input()
-locations = []
-filename = sys.argv[1]
-i = 0
-
-while True:
-    i += 1
-    print('Location ', i, ': ', sep='', end='')
-    line = input()
-    if line == 'stop' or line == '':
-        break
-    locations.append({
-        'name': line,
-        'x': get_random_value(BOARD_WIDTH),
-        'y': get_random_value(BOARD_HEIGHT),
-        'color': get_random_color(),
-    })
-
-json_string = json.dumps({
-    "name": level_name,
-    "bridges": [],
-    "locations": locations,
-}, indent=4)
-text_file = open(filename, "w")
-n = text_file.write(json_string)
-text_file.close()
+DEFAULT_BACKGROUND_PATH = 'assets/manchester_background.png'
+DISTRIBUTIONS = ('uniform', 'clustered', 'grid', 'coastline')
+
+
+def get_random_value(max, rng=random):
+    return rng.randint(BOARD_EDGES_OFFSET, max - BOARD_EDGES_OFFSET)
+
+
+def get_random_color(rng=random):
+    return rng.choice(list(COLORS.items()))[0]
+
+
+def clamp(value, limit):
+    """
+    Keeps a coordinate inside the board.
+    """
+    return int(min(max(value, BOARD_EDGES_OFFSET), limit - BOARD_EDGES_OFFSET))
+
+
+def uniform_points(count, rng):
+    # Every point anywhere on the board.
+    for _ in range(count):
+        yield get_random_value(BOARD_WIDTH, rng), get_random_value(BOARD_HEIGHT, rng)
+
+
+def clustered_points(count, rng):
+    # A few city cores, most points close to one of them.
+    num_cores = max(1, round(math.sqrt(count) / 4))
+    cores = [(get_random_value(BOARD_WIDTH, rng), get_random_value(BOARD_HEIGHT, rng), rng.uniform(15, 60))
+             for _ in range(num_cores)]
+    for _ in range(count):
+        x, y, spread = rng.choice(cores)
+        yield clamp(rng.gauss(x, spread), BOARD_WIDTH), clamp(rng.gauss(y, spread), BOARD_HEIGHT)
+
+
+def grid_points(count, rng):
+    # A regular grid covering the board, each point slightly moved from its intersection.
+    width = BOARD_WIDTH - 2 * BOARD_EDGES_OFFSET
+    height = BOARD_HEIGHT - 2 * BOARD_EDGES_OFFSET
+    columns = max(1, math.ceil(math.sqrt(count * width / height)))
+    rows = math.ceil(count / columns)
+    spacing_x = width / columns
+    spacing_y = height / rows
+    for i in range(count):
+        x = BOARD_EDGES_OFFSET + (i % columns + 0.5) * spacing_x
+        y = BOARD_EDGES_OFFSET + (i // columns + 0.5) * spacing_y
+        yield (clamp(x + rng.uniform(-0.25, 0.25) * spacing_x, BOARD_WIDTH),
+               clamp(y + rng.uniform(-0.25, 0.25) * spacing_y, BOARD_HEIGHT))
+
+
+def coastline_points(count, rng):
+    # A wavy coast across the board, points get scarcer further inland.
+    phase = rng.uniform(0, 2 * math.pi)
+    for _ in range(count):
+        x = get_random_value(BOARD_WIDTH, rng)
+        coast = BOARD_HEIGHT * (0.75 + 0.1 * math.sin(x / 90 + phase))
+        yield x, clamp(coast - abs(rng.gauss(0, BOARD_HEIGHT / 6)), BOARD_HEIGHT)
+
+
+def generate_locations(count, seed=0, distribution='uniform'):
+    """
+    Yields `count` locations placed according to `distribution`.
+    The same seed always gives the same locations.
+    """
+    rng = random.Random(seed)
+    points = {
+        'uniform': uniform_points,
+        'clustered': clustered_points,
+        'grid': grid_points,
+        'coastline': coastline_points,
+    }[distribution](count, rng)
+    i = 0
+    for x, y in points:
+        i += 1
+        yield {
+            'name': 'Location ' + str(i),
+            'x': x,
+            'y': y,
+            'color': get_random_color(rng),
+        }
+
+
+def write_level(stream, name, locations, background_path=DEFAULT_BACKGROUND_PATH):
+    """
+    Writes a level to `stream` one location at a time, so that `locations` can be a generator.
+    The output is the same as dumping the whole level with json.dumps(level, indent=4).
+    """
+    stream.write('{\n')
+    stream.write('    "name": ' + json.dumps(name) + ',\n')
+    stream.write('    "background_path": ' +
+                 json.dumps(background_path) + ',\n')
+    stream.write('    "bridges": [],\n')
+    stream.write('    "locations": [')
+    first = True
+    for loc in locations:
+        stream.write('\n' if first else ',\n')
+        stream.write(
+            '        ' + json.dumps(loc, indent=4).replace('\n', '\n        '))
+        first = False
+    stream.write(']' if first else '\n    ]')
+    stream.write('\n}')
+
+
+def interactive(filename):
+    """
+    Asks for the name of the level and of each location, places them randomly.
+    """
+    random.seed(datetime.datetime.now().timestamp())
+
+    print('Level name: ', end='')
+    level_name = input()
+    locations = []
+    i = 0
+
+    while True:
+        i += 1
+        print('Location ', i, ': ', sep='', end='')
+        line = input()
+        if line == 'stop' or line == '':
+            break
+        locations.append({
+            'name': line,
+            'x': get_random_value(BOARD_WIDTH),
+            'y': get_random_value(BOARD_HEIGHT),
+            'color': get_random_color(),
+        })
+
+    with open(filename, 'w') as text_file:
+        write_level(text_file, level_name, locations)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Create a level. Without --count, the level is created interactively.')
+    parser.add_argument('filename', help='where to write the level')
+    parser.add_argument('--count', type=int,
+                        help='generate this many locations (from 10 to 100000)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='the same seed always generates the same level')
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform',
+                        help='how the locations are spread on the board')
+    parser.add_argument('--name', help='the name of the level')
+    parser.add_argument('--background', default=DEFAULT_BACKGROUND_PATH,
+                        help='the background picture of the level')
+    args = parser.parse_args()
+
+    if args.count == None:
+        interactive(args.filename)
+        sys.exit(0)
+
+    if not 10 <= args.count <= 100_000:
+        parser.error('--count must be between 10 and 100000')
+    name = args.name or f'{args.distribution.capitalize()} {args.count} ({args.seed})'
+    with open(args.filename, 'w') as stream:
+        write_level(stream, name, generate_locations(
+            args.count, args.seed, args.distribution), args.background)
@@ -1,15 +1,108 @@
-import json
+import argparse
+import math
+import os
+import pstats
 import sys
-from game.start import start
+import time
+from game.constants import ROUTER_PATH
+from game.start import start, start_replay
+from game.evaluate import evaluate
+from game.level import load_level
+from game.profiler import Profiler
+from game.replay import Recorder
+from game.sampling import estimate
+from game.sandbox import SandboxedRouter
 
 if __name__ == '__main__':
 
+    parser = argparse.ArgumentParser(description='Railway Planner')
+    parser.add_argument('config_path', nargs='?', default='levels/paris.json',
+                        help='the level to play, JSON or compiled (defaults to levels/paris.json)')
+    parser.add_argument('--headless', action='store_true',
+                        help='evaluate the router and print its KPIs without opening a window')
+    parser.add_argument('--speed', type=int, default=1, choices=(1, 4, 16),
+                        help='how many times faster the animations are played (keys 1, 2 and 3 in game)')
+    parser.add_argument('--uncapped', action='store_true',
+                        help='do not cap the frame rate (key U in game)')
+    parser.add_argument('--sandbox', action='store_true',
+                        help='run the router in a separate process, connections are animated as they are created')
+    parser.add_argument('--time-limit', type=float,
+                        help='the CPU time (in seconds) the sandboxed router can use')
+    parser.add_argument('--memory-limit', type=int,
+                        help='the memory (in MB) the sandboxed router can allocate')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='profile the sandboxed router and write the cProfile stats to FILE')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='record how long each phase takes in the Chrome trace event format (F3 shows them in game)')
+    parser.add_argument('--record', metavar='FILE',
+                        help='record the evaluation, to play it back with --replay')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='play back a recorded evaluation, without running the router')
+    parser.add_argument('--sample', action='store_true',
+                        help='with --headless, estimate the KPIs of huge levels from a random sample of itineraries')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='the same seed always samples the same itineraries')
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help='stop sampling once the 95%% confidence intervals are within this fraction of the KPIs (defaults to 0.05)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='how many processes find the shortest paths when every itinerary is tested at once (key S in game, or --headless)')
+    parser.add_argument('--watch', action='store_true',
+                        help='evaluate router.py again whenever it is saved, without closing the window')
+    args = parser.parse_args()
+    if args.sample and (not args.headless or args.record):
+        parser.error('--sample only works with --headless, without --record')
+    if args.watch and (args.headless or args.record):
+        parser.error('--watch only works in the window, without --record')
+
+    if args.replay:
+        # Everything needed is in the replay
+        start_replay(args.replay, args.speed, args.uncapped,
+                     Profiler(args.trace))
+        sys.exit(0)
+
     # Load the configuration file
-    config_path = 'levels/paris.json'
-    if len(sys.argv) > 1:
-        config_path = sys.argv[1]
-    with open(config_path, 'r') as stream:
-        config = json.load(stream)
-
-    # Start the game with the config
-    start(config)
+    config = load_level(args.config_path)
+
+    # Limits and profiling only make sense in a sandbox
+    sandbox = None
+    if args.sandbox or args.time_limit or args.memory_limit or args.profile:
+        memory_limit = args.memory_limit * 1024 * 1024 if args.memory_limit else None
+        sandbox = SandboxedRouter(
+            ROUTER_PATH, args.time_limit, memory_limit, args.profile)
+
+    profiler = Profiler(args.trace)
+    recorder = Recorder(args.record) if args.record else None
+
+    if args.headless:
+        # Evaluate the student's algorithm without any rendering
+        from router import connect_locations
+        started_at = time.perf_counter()
+        if args.sample:
+            evaluation = estimate(config, connect_locations, sandbox, profiler,
+                                  args.seed, args.tolerance)
+        else:
+            evaluation = evaluate(config, connect_locations, sandbox, profiler, recorder, args.jobs)
+        elapsed = time.perf_counter() - started_at
+        print(config['name'])
+        for title, value in evaluation.kpis():
+            print(f'{title}: {value}')
+        if evaluation.baseline != None:
+            baseline = evaluation.baseline
+            print(f'Baseline (minimum spanning tree): {math.floor(baseline.average_travel_time)}min, '
+                  f'{math.floor(baseline.cost)}mi$')
+        if evaluation.router_error:
+            print(evaluation.router_error)
+        if evaluation.network_error:
+            print(evaluation.network_error)
+        print(f'Evaluated in {elapsed * 1000:.1f}ms')
+        profiler.write_trace()
+        if recorder != None:
+            recorder.close()
+    else:
+        # Start the game with the config
+        start(config, args.speed, args.uncapped,
+              sandbox, profiler, recorder, args.jobs, args.watch)
+
+    if args.profile and os.path.exists(args.profile):
+        # Show where the router spends its time
+        pstats.Stats(args.profile).sort_stats('cumulative').print_stats(15)
@@ -0,0 +1,83 @@
+import pytest
+from game.baseline import Baseline, euclidean_mst
+from game.evaluate import evaluate
+from game.utils import INFINITY, Location, distance_between
+from level_generator import generate_locations
+
+
+def prim_length(locations: list):
+    # The length of the minimum spanning tree, in O(n²).
+    n = len(locations)
+    closest = [INFINITY] * n
+    closest[0] = 0
+    done = [False] * n
+    total = 0
+    for _ in range(n):
+        current = min((i for i in range(n) if not done[i]),
+                      key=lambda i: closest[i])
+        done[current] = True
+        total += closest[current]
+        for i in range(n):
+            if not done[i]:
+                closest[i] = min(closest[i], distance_between(
+                    locations[current], locations[i]))
+    return total
+
+
+def tree_length(locations: list, connections: list):
+    return sum(distance_between(locations[a_idx], locations[b_idx]) for a_idx, b_idx in connections)
+
+
+def generated(count: int, seed: int, distribution: str):
+    return [Location(loc['x'], loc['y'], loc['name'], loc['color'])
+            for loc in generate_locations(count, seed, distribution)]
+
+
+def two_clusters_and_a_far_location():
+    locations = [Location(100 + i % 4, 100 + i // 4, f'a{i}', 'red') for i in range(12)]
+    locations += [Location(600 + i % 4, 100 + i // 4, f'b{i}', 'red') for i in range(12)]
+    locations.append(Location(350, 600, 'far', 'red'))
+    return locations
+
+
+@pytest.mark.parametrize('locations', [
+    generated(50, 1, 'clustered'),
+    generated(400, 2, 'clustered'),
+    generated(300, 0, 'uniform'),
+    generated(200, 3, 'grid'),
+    generated(300, 4, 'coastline'),
+    two_clusters_and_a_far_location(),
+])
+def test_minimum_spanning_tree(locations: list):
+    connections = euclidean_mst(locations)
+    assert len(connections) == len(locations) - 1
+    assert tree_length(locations, connections) == pytest.approx(
+        prim_length(locations))
+
+
+def test_baseline_kpis_match_the_evaluation_of_the_tree():
+    config = {
+        'name': 'Baseline',
+        'background_path': '',
+        'locations': list(generate_locations(60, 5, 'clustered')),
+    }
+
+    def tree_router(locations: list, connect):
+        baseline = Baseline(locations)
+        for a_idx, b_idx in baseline.connections:
+            connect(baseline.locations[a_idx], baseline.locations[b_idx])
+
+    evaluation = evaluate(config, tree_router)
+    assert evaluation.cost == pytest.approx(evaluation.baseline.cost)
+    assert evaluation.average_travel_time() == pytest.approx(
+        evaluation.baseline.average_travel_time)
+    assert evaluation.ratios() == pytest.approx((1, 1))
+
+
+def test_no_ratios_without_a_network():
+    evaluation = evaluate({
+        'name': 'Empty',
+        'background_path': '',
+        'locations': list(generate_locations(10, 0)),
+    }, lambda locations, connect: None)
+    assert evaluation.ratios() == (None, None)
@@ -0,0 +1,123 @@
+import pytest
+import threading
+from game import evaluate as evaluate_module
+from game.evaluate import Evaluation, evaluate
+from game.utils import INFINITY, Itineraries, distance_between
+
+
+def lattice_level(columns: int = 7, rows: int = 6):
+    # Many paths of the same length between most locations.
+    return {
+        'name': 'Lattice',
+        'background_path': '',
+        'locations': [{'name': f'{x},{y}', 'x': 100 + 40 * x, 'y': 100 + 40 * y, 'color': 'red'}
+                      for y in range(rows) for x in range(columns)],
+    }
+
+
+def lattice_router(steps: tuple = ((40, 0), (0, 40), (40, 40))):
+    # Each location to its neighbours at each of `steps`, by default its right, bottom and bottom right ones.
+    def router(locations: list, connect):
+        by_position = {(loc.x, loc.y): loc for loc in locations}
+        for loc in locations:
+            for dx, dy in steps:
+                other = by_position.get((loc.x + dx, loc.y + dy))
+                if other != None:
+                    connect(loc, other)
+    return router
+
+
+FOUR_NEIGHBOURS = ((40, 0), (0, 40))
+EIGHT_NEIGHBOURS = ((40, 0), (0, 40), (40, 40), (-40, 40))
+
+
+def original_loads(evaluation: Evaluation):
+    # The times each connection is used when each itinerary is tested with the pathfinding the game
+    # always had: the open location with the lowest f score that was added to the open list first is
+    # explored next, and a location only gets a new previous location on a strictly shorter path.
+    locations = evaluation.locations
+    graph = evaluation.graph
+    neighbours = [[neighbour for neighbour, _, _ in entries] for entries in graph.adjacency]
+    connections = {}
+    for con in graph.connections:
+        a_idx = graph.get_location_index(con.a)
+        b_idx = graph.get_location_index(con.b)
+        connections[(a_idx, b_idx)] = connections[(b_idx, a_idx)] = con
+    used = {id(con): 0 for con in graph.connections}
+    for a_idx, b_idx in Itineraries(graph):
+        g_score = {a_idx: 0}
+        f_score = {a_idx: distance_between(locations[a_idx], locations[b_idx])}
+        came_from = {}
+        open = [a_idx]
+        while len(open) > 0:
+            current = min(open, key=lambda i: f_score[i])
+            if current == b_idx:
+                while current in came_from:
+                    used[id(connections[(came_from[current], current)])] += 1
+                    current = came_from[current]
+                break
+            open.remove(current)
+            for n in neighbours[current]:
+                tentative_g_score = g_score[current] + distance_between(locations[current], locations[n])
+                if tentative_g_score < g_score.get(n, INFINITY):
+                    came_from[n] = current
+                    g_score[n] = tentative_g_score
+                    f_score[n] = tentative_g_score + distance_between(locations[n], locations[b_idx])
+                    if n not in open:
+                        open.append(n)
+    return [used[id(con)] for con in graph.connections]
+
+
+def one_by_one(config: dict, router):
+    evaluation = Evaluation(config, router)
+    evaluation.connect_locations()
+    evaluation.score_baseline()
+    while len(evaluation.connections_buffer):
+        evaluation.add_next_connection()
+    while len(evaluation.itineraries_to_test):
+        evaluation.test_next_itinerary()
+    return evaluation
+
+
+def loads(evaluation: Evaluation):
+    return [con.times_used for con in evaluation.graph.connections]
+
+
+@pytest.mark.parametrize('steps', [FOUR_NEIGHBOURS, EIGHT_NEIGHBOURS])
+def test_one_by_one_matches_the_original_pathfinding(steps: tuple):
+    evaluation = one_by_one(lattice_level(7, 7), lattice_router(steps))
+    assert loads(evaluation) == original_loads(evaluation)
+
+
+def test_congestion_of_the_original_pathfinding():
+    evaluation = evaluate(lattice_level(7, 7), lattice_router(FOUR_NEIGHBOURS))
+    assert evaluation.traffic_congestion == pytest.approx(884.249, abs=1e-3)
+
+
+@pytest.mark.parametrize('steps', [FOUR_NEIGHBOURS, EIGHT_NEIGHBOURS, ((40, 0), (0, 40), (40, 40))])
+def test_all_itineraries_at_once_match_one_by_one(steps: tuple):
+    config = lattice_level()
+    expected = one_by_one(config, lattice_router(steps))
+    evaluation = evaluate(config, lattice_router(steps))
+    assert evaluation.results() == expected.results()
+    assert loads(evaluation) == loads(expected)
+
+
+@pytest.mark.parametrize('steps', [FOUR_NEIGHBOURS, EIGHT_NEIGHBOURS, ((40, 0), (0, 40), (40, 40))])
+def test_several_jobs_match_one_by_one(monkeypatch, steps: tuple):
+    monkeypatch.setattr(evaluate_module, 'PARALLEL_MIN_ITINERARIES', 0)
+    config = lattice_level()
+    expected = one_by_one(config, lattice_router(steps))
+    evaluation = evaluate(config, lattice_router(steps), jobs=2)
+    assert evaluation.results() == expected.results()
+    assert loads(evaluation) == loads(expected)
+
+
+def test_run_returns_at_once_when_stopping():
+    stopping = threading.Event()
+    stopping.set()
+    evaluation = Evaluation(lattice_level(), lattice_router())
+    evaluation.connect_locations()
+    evaluation.run(stopping)
+    assert len(evaluation.graph.connections) == 0
+    assert evaluation.num_travels == 0
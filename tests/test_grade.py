@@ -0,0 +1,33 @@
+from game.grade import grade, grade_submission
+
+ROUTERS = {
+    'empty': 'def connect_locations(locations, connect):\n    pass\n',
+    'chain': 'def connect_locations(locations, connect):\n'
+             '    for a, b in zip(locations, locations[1:]):\n        connect(a, b)\n',
+    'crash': 'def connect_locations(locations, connect):\n'
+             '    connect(locations[0], locations[1])\n    1 / 0\n',
+}
+
+
+def write_routers(directory):
+    submissions = []
+    for name, source in ROUTERS.items():
+        path = directory / f'{name}.py'
+        path.write_text(source)
+        submissions.append((name, str(path)))
+    return submissions
+
+
+def test_connected_networks_rank_first(tmp_path):
+    rows = grade(write_routers(tmp_path), ['levels/paris.json'], jobs=1)
+    assert [row['submission'] for row in rows] == ['chain', 'empty', 'crash']
+
+
+def test_failed_submissions_have_the_same_row_in_a_sandbox(tmp_path):
+    _, path = [submission for submission in write_routers(tmp_path) if submission[0] == 'crash'][0]
+    row = grade_submission('crash', path, 'levels/paris.json')
+    sandboxed = grade_submission('crash', path, 'levels/paris.json', time_limit=5)
+    del row['seconds'], sandboxed['seconds']
+    assert row == sandboxed
+    assert row['error'] == 'Router failed: ZeroDivisionError: division by zero'
+    assert row['cost'] == ''
@@ -0,0 +1,13 @@
+from game.evaluate import evaluate
+from game.sandbox import SandboxedRouter
+from game.level import load_level
+
+
+def test_connections_are_sent_before_the_router_runs_out_of_time(tmp_path):
+    path = tmp_path / 'stuck.py'
+    path.write_text('def connect_locations(locations, connect):\n'
+                    '    connect(locations[0], locations[1])\n'
+                    '    while True:\n        pass\n')
+    evaluation = evaluate(load_level('levels/paris.json'), None, SandboxedRouter(str(path), time_limit=1))
+    assert evaluation.router_error == 'Router exceeded its time limit'
+    assert len(evaluation.graph.connections) == 1